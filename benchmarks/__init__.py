@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks del motor de horarios. Se ejecutan con: python -m benchmarks"""
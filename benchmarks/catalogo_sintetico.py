@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Catalogos sinteticos reproducibles para medir el motor.
+
+Un catalogo se describe con cuatro numeros: materias x secciones por materia
+x bloques por seccion, mas una densidad de choques entre 0 y 1. Las clases
+duran 90 minutos y empiezan cada media hora entre las 07:00 y las 20:00, de
+lunes a viernes; la densidad recorta la cantidad de franjas disponibles
+(0 = todas, 0.9 = solo un 10%), asi que con mas densidad las secciones se
+amontonan en menos horas y chocan mas. La misma semilla da siempre el mismo
+catalogo.
+"""
+import random
+from typing import Iterator, List
+
+import engine
+from engine import Bloque, Dia, Materia, Opcion, minutos_a_hora
+
+DURACION = 90
+FRANJAS = [
+    (dia, inicio)
+    for dia in (Dia.LUN, Dia.MAR, Dia.MIE, Dia.JUE, Dia.VIE)
+    for inicio in range(7 * 60, 20 * 60 + 1, 30)
+]
+
+def generar_catalogo(materias: int, secciones: int, bloques: int,
+                     densidad: float = 0.5, semilla: int = 0) -> List[Materia]:
+    """
+    Lista de engine.Materia con 'secciones' opciones de 'bloques' bloques
+    cada una, en dias distintos (menos bloques si con tanta densidad las
+    franjas que quedan no cubren suficientes dias).
+    """
+    if not 0 <= densidad < 1:
+        raise ValueError("La densidad debe estar entre 0 y 1 (sin incluir el 1)")
+    azar = random.Random(semilla)
+
+    disponibles = max(bloques, round(len(FRANJAS) * (1 - densidad)))
+    franjas = azar.sample(FRANJAS, disponibles)
+
+    catalogo = []
+    id_opcion = 1
+    for m in range(materias):
+        nombre = f"Materia {m + 1:03d}"
+        opciones = []
+        for s in range(secciones):
+            # Una seccion no repite dia (como Lun-Mie-Vie en la vida real)
+            elegidas, dias = [], set()
+            for dia, inicio in azar.sample(franjas, len(franjas)):
+                if dia not in dias:
+                    elegidas.append((dia, inicio))
+                    dias.add(dia)
+                if len(elegidas) == bloques:
+                    break
+            salon = f"{azar.choice('ABCDE')}{azar.randint(1, 3)}{azar.randint(0, 20):02d}"
+            opciones.append(Opcion(
+                id_opcion=id_opcion,
+                nombre_materia=nombre,
+                profesor=f"Profesor {azar.randint(1, materias * 3):03d}",
+                salon=salon,
+                bloques=[Bloque(dia, inicio, inicio + DURACION, salon) for dia, inicio in sorted(elegidas)]
+            ))
+            id_opcion += 1
+        catalogo.append(Materia(m + 1, nombre, opciones))
+    return catalogo
+
+def densidad_real(materias: List[Materia]) -> float:
+    """Fraccion de pares de secciones (de materias distintas) que chocan."""
+    indice = engine.IndiceCompatibilidad(materias)
+    pares = compatibles = 0
+    for a, rango_a in enumerate(indice.rangos):
+        otras = 0
+        for bits in indice.bits_materia[a + 1:]:
+            otras |= bits
+        for i in rango_a:
+            pares += otras.bit_count()
+            compatibles += (indice.compatibles[i] & otras).bit_count()
+    return 1 - compatibles / pares if pares else 0.0
+
+def filas_importador(materias: List[Materia]) -> Iterator[tuple]:
+    """El catalogo como flujo de filas para importador.importar_filas."""
+    for materia in materias:
+        for opcion in materia.opciones:
+            for bloque in opcion.bloques:
+                yield (
+                    opcion.id_opcion, materia.nombre, opcion.id_opcion, opcion.profesor,
+                    {
+                        'dia': engine.DIAS[bloque.dia],
+                        'inicio': minutos_a_hora(bloque.hora_inicio),
+                        'fin': minutos_a_hora(bloque.hora_fin),
+                        'salon': bloque.salon
+                    }
+                )
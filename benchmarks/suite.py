@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Mediciones del motor sobre catalogos sinteticos (ver catalogo_sintetico).
+
+Por escenario se mide tiempo (el mejor de N repeticiones) y pico de memoria
+(una pasada aparte con tracemalloc, que hace lento lo que mide) de:
+  indice    construir engine.IndiceCompatibilidad
+  contar    engine.contar_combinaciones
+  generar   los primeros LIMITE_GENERAR horarios (todos si son menos),
+            como listas de Opcion igual que generar_combinaciones
+  mejores   engine.mejores_selecciones (los 20 con menos huecos)
+  importar  cargar el catalogo a una base temporal con importador.py
+  leer_bd   leer esa base con catalogo.materias_para_motor
+Las ofertas (catalogos del tamano de una universidad entera, de los que nadie
+inscribe todo) solo miden importar y leer_bd.
+
+Uso:
+  python -m benchmarks [--escenarios pequeno mediano] [--repeticiones 3]
+                       [--guardar] [--comparar] [--umbral 1.5]
+
+--guardar escribe los resultados en baseline.json; --comparar los compara con
+ese archivo y termina con codigo 1 si alguna medicion tarda mas de 'umbral'
+veces la base. Los tiempos solo son comparables en la misma maquina.
+"""
+import argparse
+import contextlib
+import gc
+import itertools
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import catalogo
+import database
+import engine
+import importador
+from benchmarks.catalogo_sintetico import densidad_real, filas_importador, generar_catalogo
+
+RUTA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+LIMITE_GENERAR = 100_000
+SEMILLA = 2024
+# Diferencias menores no cuentan como regresion (ruido del reloj en mediciones cortas)
+MARGEN_SEGUNDOS = 0.005
+
+# materias x secciones x bloques por seccion, densidad de choques
+ESCENARIOS = {
+    'pequeno': dict(materias=5, secciones=6, bloques=2, densidad=0.5),
+    'mediano': dict(materias=7, secciones=12, bloques=2, densidad=0.6),
+    'grande': dict(materias=8, secciones=30, bloques=3, densidad=0.7),
+}
+OFERTAS = {
+    'oferta': dict(materias=400, secciones=10, bloques=3, densidad=0.3),
+}
+
+# --- Medicion ---
+
+def medir(funcion, repeticiones):
+    """Mejor tiempo de 'repeticiones' llamadas y pico de memoria de una mas."""
+    tiempos = []
+    for _ in range(repeticiones):
+        gc.collect()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    gc.collect()
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'segundos': round(min(tiempos), 6), 'memoria_pico_kb': pico // 1024}
+
+def medir_escenario(parametros, repeticiones):
+    materias = generar_catalogo(**parametros, semilla=SEMILLA)
+    indice = engine.IndiceCompatibilidad(materias)
+    resultado = {
+        'parametros': parametros,
+        'densidad_real': round(densidad_real(materias), 4),
+        'horarios': engine.contar_combinaciones(materias, indice),
+        'mediciones': {}
+    }
+    mediciones = resultado['mediciones']
+
+    mediciones['indice'] = medir(lambda: engine.IndiceCompatibilidad(materias), repeticiones)
+    mediciones['contar'] = medir(lambda: engine.contar_combinaciones(materias, indice), repeticiones)
+    mediciones['generar'] = medir(
+        lambda: list(itertools.islice(engine.iterar_combinaciones(materias, indice), LIMITE_GENERAR)),
+        repeticiones
+    )
+    mediciones['mejores'] = medir(lambda: engine.mejores_selecciones(materias, 20, indice=indice), repeticiones)
+    mediciones.update(medir_base_de_datos(materias, repeticiones))
+    return resultado
+
+def medir_oferta(parametros, repeticiones):
+    materias = generar_catalogo(**parametros, semilla=SEMILLA)
+    return {'parametros': parametros, 'mediciones': medir_base_de_datos(materias, repeticiones)}
+
+def medir_base_de_datos(materias, repeticiones):
+    """Importa el catalogo a una base temporal (nueva en cada repeticion) y lo vuelve a leer."""
+    ruta_original = database.obtener_ruta()
+    with tempfile.TemporaryDirectory() as carpeta:
+        rutas = (os.path.join(carpeta, f"bench{n}.db") for n in itertools.count())
+
+        def importar():
+            database.configurar_ruta(next(rutas))
+            database.inicializar_db()
+            importador.importar_filas(filas_importador(materias))
+
+        def leer():
+            catalogo.invalidar()
+            catalogo.materias_para_motor()
+
+        try:
+            # database informa con print; no debe mezclarse con el reporte
+            with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+                mediciones = {'importar': medir(importar, repeticiones)}
+            mediciones['leer_bd'] = medir(leer, repeticiones)
+        finally:
+            database.cerrar_conexion()
+            database.configurar_ruta(ruta_original)
+    return mediciones
+
+# --- Comparacion con la base ---
+
+def comparar(resultados, base, umbral):
+    """Lineas del reporte y cuantas mediciones empeoraron mas de 'umbral' veces."""
+    lineas, regresiones = [], 0
+    for nombre, actual in resultados.items():
+        anterior = base.get('escenarios', {}).get(nombre)
+        if anterior is None or anterior['parametros'] != actual['parametros']:
+            lineas.append(f"{nombre}: sin base comparable")
+            continue
+        for medida, valores in actual['mediciones'].items():
+            previo = anterior['mediciones'].get(medida)
+            if previo is None:
+                continue
+            razon = valores['segundos'] / max(previo['segundos'], 1e-9)
+            marca = ''
+            if razon > umbral and valores['segundos'] - previo['segundos'] > MARGEN_SEGUNDOS:
+                marca = '  <-- REGRESION'
+                regresiones += 1
+            lineas.append(
+                f"{nombre:>8} {medida:<9} {previo['segundos']:9.4f} s -> {valores['segundos']:9.4f} s"
+                f"  (x{razon:.2f}){marca}"
+            )
+    return lineas, regresiones
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Mide el motor de horarios con catalogos sinteticos.")
+    todos = list(ESCENARIOS) + list(OFERTAS)
+    parser.add_argument('--escenarios', nargs='+', choices=todos, default=todos)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--guardar', action='store_true', help=f"Guardar los resultados en {RUTA_BASE}")
+    parser.add_argument('--comparar', action='store_true', help="Comparar con los resultados guardados")
+    parser.add_argument('--umbral', type=float, default=1.5,
+                        help="Cuantas veces mas lento cuenta como regresion")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for nombre in args.escenarios:
+        if nombre in OFERTAS:
+            print(f"== {nombre}: {OFERTAS[nombre]}")
+            resultado = resultados[nombre] = medir_oferta(OFERTAS[nombre], args.repeticiones)
+        else:
+            print(f"== {nombre}: {ESCENARIOS[nombre]}")
+            resultado = resultados[nombre] = medir_escenario(ESCENARIOS[nombre], args.repeticiones)
+            print(f"   {resultado['horarios']} horarios, densidad real {resultado['densidad_real']:.1%}")
+        for medida, valores in resultado['mediciones'].items():
+            print(f"   {medida:<9} {valores['segundos']:9.4f} s  {valores['memoria_pico_kb']:>8} KB")
+
+    codigo = 0
+    if args.comparar:
+        try:
+            with open(RUTA_BASE, encoding='utf-8') as archivo:
+                base = json.load(archivo)
+        except (OSError, ValueError) as e:
+            print(f"No se pudo leer la base: {e}")
+            return 1
+        print(f"\n-- Contra la base ({base.get('maquina', '?')}, Python {base.get('python', '?')}):")
+        lineas, regresiones = comparar(resultados, base, args.umbral)
+        print("\n".join(lineas))
+        if regresiones:
+            print(f"{regresiones} mediciones empeoraron mas de x{args.umbral}.")
+            codigo = 1
+
+    if args.guardar:
+        base = {
+            'python': platform.python_version(),
+            'maquina': f"{platform.system()} {platform.machine()}",
+            'limite_generar': LIMITE_GENERAR,
+            'semilla': SEMILLA,
+            'escenarios': resultados
+        }
+        with open(RUTA_BASE, 'w', encoding='utf-8') as archivo:
+            json.dump(base, archivo, indent=2, ensure_ascii=False)
+            archivo.write('\n')
+        print(f"\nResultados guardados en {RUTA_BASE}.")
+    return codigo
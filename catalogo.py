@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Repositorio del catalogo: lee una sola vez el JOIN materias/opciones/bloques
+y lo guarda en memoria, tanto en filas (para la vista global) como en objetos
+engine.Materia (para el generador).
+
+La copia sigue vigente mientras database.version_datos() no cambie; las
+funciones de database que escriben la incrementan, asi que generar varias
+veces seguidas no vuelve a leer las tablas. Lo que se devuelve es compartido:
+no debe modificarse.
+"""
+import string
+from typing import List, Optional, Tuple
+
+import database
+import engine
+import instrumentacion
+
+# Una fila por bloque:
+# (materia, id_opcion, profesor, salon, dia, hora_inicio, hora_fin)
+# con dia entero (engine.Dia) y horas como texto 'HH:MM'.
+FilaBloque = Tuple[str, int, str, str, int, str, str]
+
+_CONSULTA_BLOQUES = """
+    SELECT m.nombre, o.id, o.profesor, COALESCE(b.salon, o.salon), b.dia_num, b.hora_inicio, b.hora_fin
+    FROM bloques b
+    JOIN opciones o ON b.opcion_id = o.id
+    JOIN materias m ON o.materia_id = m.id
+    WHERE b.dia_num IS NOT NULL {filtro}
+    ORDER BY o.id, b.id
+"""
+
+# LOWER() de SQLite solo cambia letras ASCII ('Á' queda igual); la clave de
+# una materia debe agrupar exactamente lo mismo que las consultas por nombre.
+_MINUSCULAS_SQLITE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def clave_materia(nombre) -> str:
+    """Nombre normalizado como LOWER(nombre) en SQLite."""
+    return nombre.translate(_MINUSCULAS_SQLITE)
+
+_version = None
+_filas: List[FilaBloque] = []
+_materias: Optional[List[engine.Materia]] = None
+
+def invalidar():
+    """Olvida la copia en memoria; la siguiente consulta relee la base."""
+    global _version, _filas, _materias
+    _version, _filas, _materias = None, [], None
+
+def _actualizar(estricto=False):
+    global _version, _filas, _materias
+    version = database.version_datos()
+    if version == _version:
+        instrumentacion.sumar('catalogo.en_cache')
+        return
+
+    try:
+        with instrumentacion.medir('catalogo.leer'):
+            filas = database.consultar(_CONSULTA_BLOQUES.format(filtro=''))
+    except database.Error as e:
+        # No se guarda la version: se reintenta en la siguiente consulta
+        invalidar()
+        if estricto:
+            raise
+        print(f"Error al leer el catalogo: {e}")
+        return
+
+    _version, _filas, _materias = version, filas, None
+
+def filas() -> List[FilaBloque]:
+    """Todos los bloques del catalogo (ver FilaBloque)."""
+    _actualizar()
+    return _filas
+
+def filas_de_materia(nombre) -> List[FilaBloque]:
+    """
+    Los bloques de una materia (sin distinguir mayusculas), leidos directo de
+    la base con el indice por nombre; para refrescar solo lo que cambio sin
+    esperar a recargar el catalogo entero.
+    """
+    if _version is not None and _version == database.version_datos():
+        clave = clave_materia(nombre)
+        return [fila for fila in _filas if clave_materia(fila[0]) == clave]
+    try:
+        return database.consultar(
+            _CONSULTA_BLOQUES.format(filtro="AND LOWER(m.nombre) = LOWER(?)"), (nombre,)
+        )
+    except database.Error as e:
+        print(f"Error al leer la materia '{nombre}': {e}")
+        return []
+
+def materias_para_motor(estricto=False) -> List[engine.Materia]:
+    """
+    El catalogo como lista de engine.Materia, listo para el generador. Las
+    materias con el mismo nombre se agrupan en una sola. Si la base no se
+    puede leer devuelve una lista vacia, o con estricto=True deja pasar el
+    database.Error (para quien no debe confundirlo con un catalogo vacio).
+    """
+    global _materias
+    _actualizar(estricto)
+    if _materias is not None:
+        return _materias
+
+    with instrumentacion.medir('catalogo.materias'):
+        agrupacion = {}
+        for nombre, id_op, prof, salon, dia, inicio, fin in _filas:
+            opciones = agrupacion.setdefault(nombre, {})
+            if id_op not in opciones:
+                opciones[id_op] = engine.Opcion(
+                    id_opcion=id_op,
+                    nombre_materia=nombre,
+                    profesor=prof,
+                    salon=salon,
+                    bloques=[]
+                )
+            opciones[id_op].bloques.append(engine.Bloque(
+                dia,
+                engine.convertir_hora_a_minutos(inicio),
+                engine.convertir_hora_a_minutos(fin),
+                salon
+            ))
+
+        _materias = [
+            engine.Materia(id_falso, nombre, list(opciones.values()))
+            for id_falso, (nombre, opciones) in enumerate(agrupacion.items(), 1)
+        ]
+    return _materias
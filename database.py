@@ -1,24 +1,145 @@
 # -*- coding: utf-8 -*-
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 from sqlite3 import Error
 
+import instrumentacion
+from engine import DIAS, Dia
+
+# --- Gestion de Conexiones ---
+# Cada hilo reutiliza una sola conexion abierta (con su cache de sentencias
+# compiladas) en vez de abrir y cerrar el archivo en cada funcion.
+
+RUTA_POR_DEFECTO = 'horario.db'
+TAMANO_CACHE_SENTENCIAS = 256
+
+# Se aplican a cada conexion nueva. WAL deja leer mientras otra conexion
+# escribe; con WAL, synchronous=NORMAL sigue siendo seguro ante caidas de la
+# aplicacion. SQLite trae foreign_keys apagado por defecto, y sin el los
+# ON DELETE CASCADE del esquema no hacen nada.
+PRAGMAS_CONEXION = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+)
+
+_ruta_db = os.environ.get('HORARIO_DB', RUTA_POR_DEFECTO)
+_local = threading.local()
+
+def configurar_ruta(ruta):
+    """Cambia el archivo de base de datos (por defecto $HORARIO_DB o 'horario.db')."""
+    global _ruta_db
+    cerrar_conexion()
+    _ruta_db = ruta
+    # Otro archivo son otros datos: las copias en memoria ya no sirven
+    marcar_datos_modificados()
+
+def obtener_ruta():
+    return _ruta_db
+
+def _abrir(ruta):
+    conn = sqlite3.connect(ruta, cached_statements=TAMANO_CACHE_SENTENCIAS)
+    for pragma in PRAGMAS_CONEXION:
+        conn.execute(pragma)
+    return conn
+
 def crear_conexion():
-    """Crea una conexion a la base de datos SQLite."""
+    """Crea una conexion NUEVA e independiente; quien la pide debe cerrarla."""
     conn = None
     try:
-        conn = sqlite3.connect('horario.db')
+        conn = _abrir(_ruta_db)
         return conn
     except Error as e:
         print(f"Error al conectar a la base de datos: {e}")
     return conn
 
-def inicializar_db():
-    """Crea las tablas necesarias si no existen."""
-    conn = crear_conexion()
+def obtener_conexion():
+    """Devuelve la conexion del hilo actual, abriendola la primera vez."""
+    conn = getattr(_local, 'conexion', None)
+    if conn is None or _local.ruta != _ruta_db:
+        if conn is not None:
+            conn.close()
+        conn = _abrir(_ruta_db)
+        _local.conexion = conn
+        _local.ruta = _ruta_db
+    return conn
+
+def cerrar_conexion():
+    """Cierra la conexion del hilo actual (se reabre sola si se vuelve a usar)."""
+    conn = getattr(_local, 'conexion', None)
     if conn is not None:
-        try:
-            cursor = conn.cursor()
-            
+        conn.close()
+        _local.conexion = None
+
+def _contar_sentencia(sql):
+    instrumentacion.sumar('bd.sentencias')
+
+@contextmanager
+def transaccion():
+    """
+    Uso: with transaccion() as cursor: ...
+    Confirma al salir del bloque y deshace todo si ocurre una excepcion.
+    Con la instrumentacion activa se cuentan las sentencias ejecutadas
+    (cada fila de un executemany cuenta como una).
+    """
+    conn = obtener_conexion()
+    cursor = conn.cursor()
+    medida = instrumentacion.activa()
+    if medida:
+        conn.set_trace_callback(_contar_sentencia)
+    try:
+        with instrumentacion.medir('bd.transaccion'):
+            yield cursor
+            conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if medida:
+            conn.set_trace_callback(None)
+
+def consultar(sql, parametros=()):
+    """Ejecuta una consulta de lectura y devuelve todas las filas."""
+    with transaccion() as cursor:
+        cursor.execute(sql, parametros)
+        filas = cursor.fetchall()
+    instrumentacion.sumar('bd.filas', len(filas))
+    return filas
+
+# --- Version de los Datos ---
+# Permite a quien guarda copias en memoria del catalogo (ver catalogo.py)
+# saber si siguen vigentes sin volver a leer las tablas.
+
+_version_datos = 0
+
+def marcar_datos_modificados():
+    """Lo llaman las funciones que escriben en las tablas, tras confirmar."""
+    global _version_datos
+    _version_datos += 1
+
+def version_datos():
+    """
+    Cambia cada vez que se modifican los datos: el contador local cubre las
+    escrituras de este proceso y PRAGMA data_version las confirmadas por
+    otras conexiones (por ejemplo el importador corriendo aparte).
+    """
+    data_version = obtener_conexion().execute("PRAGMA data_version").fetchone()[0]
+    return _version_datos, data_version
+
+def inicializar_db():
+    """
+    Crea las tablas necesarias si no existen y migra las anteriores.
+    Devuelve False (y no cambia nada) si algo falla.
+    """
+    try:
+        with transaccion() as cursor:
+            # sqlite3 no abre transaccion antes de CREATE/ALTER: sin este
+            # BEGIN una migracion fallida dejaria los cambios a medias
+            cursor.execute("BEGIN")
+
             # 1. Tabla de Materias
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS materias (
@@ -48,6 +169,7 @@ def inicializar_db():
                     hora_inicio TEXT NOT NULL,
                     hora_fin TEXT NOT NULL,
                     salon TEXT,
+                    dia_num INTEGER,
                     FOREIGN KEY (opcion_id) REFERENCES opciones (id) ON DELETE CASCADE
                 );
             """)
@@ -67,14 +189,53 @@ def inicializar_db():
                     """
                 )
 
-            conn.commit()
-            print("Base de datos inicializada correctamente.")
-        except Error as e:
-            print(f"Error al crear las tablas: {e}")
-        finally:
-            conn.close()
-    else:
-        print("Error: No se pudo establecer la conexion.")
+            # Migracion ligera: dia como entero (Dia.LUN = 0 ... Dia.DOM = 6).
+            # 'dia' (texto) queda solo para mostrar.
+            if 'dia_num' not in columnas:
+                cursor.execute("ALTER TABLE bloques ADD COLUMN dia_num INTEGER")
+            # Un dia que no se reconoce aborta toda la inicializacion (se
+            # deshace): dejar el bloque sin dia_num lo sacaria del catalogo
+            # sin que nadie se entere.
+            cursor.execute("SELECT DISTINCT dia FROM bloques WHERE dia_num IS NULL")
+            no_reconocidos = []
+            for (texto,) in cursor.fetchall():
+                try:
+                    dia = Dia.desde_texto(texto)
+                except ValueError:
+                    no_reconocidos.append(texto)
+                    continue
+                cursor.execute(
+                    "UPDATE bloques SET dia_num = ? WHERE dia = ? AND dia_num IS NULL",
+                    (int(dia), texto)
+                )
+            if no_reconocidos:
+                cursor.execute(
+                    f"SELECT id, dia FROM bloques WHERE dia IN ({','.join(['?'] * len(no_reconocidos))})",
+                    no_reconocidos
+                )
+                detalle = ", ".join(f"bloque {id_bloque}: {texto!r}" for id_bloque, texto in cursor.fetchall())
+                raise ValueError(f"Dias no reconocidos en la tabla bloques ({detalle}); "
+                                 f"corrija la columna dia de esos bloques")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_bloques_dia_num ON bloques (dia_num)")
+
+            # Limpieza: filas huerfanas que quedaron de cuando foreign_keys
+            # estaba apagado y los borrados no se propagaban.
+            cursor.execute("DELETE FROM opciones WHERE materia_id NOT IN (SELECT id FROM materias)")
+            cursor.execute("DELETE FROM bloques WHERE opcion_id NOT IN (SELECT id FROM opciones)")
+
+            # Indices para las llaves foraneas (los JOIN y los borrados en
+            # cascada las recorren) y para las busquedas por nombre sin
+            # distincion de mayusculas: LOWER(nombre) = LOWER(?).
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_opciones_materia ON opciones (materia_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_bloques_opcion ON bloques (opcion_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_materias_nombre_lower ON materias (LOWER(nombre))")
+
+        marcar_datos_modificados()
+        print("Base de datos inicializada correctamente.")
+        return True
+    except (Error, ValueError) as e:
+        print(f"Error al crear las tablas: {e}")
+        return False
 
 if __name__ == '__main__':
     inicializar_db()
@@ -85,6 +246,7 @@ def _insertar_opcion_y_bloques(cursor, id_materia, datos):
     """
     Inserta una opcion (profesor) y sus bloques con salon para una materia
     existente usando un cursor abierto dentro de una transaccion activa.
+    Un dia que no se reconoce lanza ValueError (y la transaccion se deshace).
     """
     bloques = datos['bloques']
     salon_opcion = bloques[0].get('salon', '') if bloques else ''
@@ -93,15 +255,19 @@ def _insertar_opcion_y_bloques(cursor, id_materia, datos):
     cursor.execute(sql_opcion, (id_materia, datos['profesor'], salon_opcion))
     id_opcion = cursor.lastrowid
 
-    sql_bloque = "INSERT INTO bloques (opcion_id, dia, hora_inicio, hora_fin, salon) VALUES (?, ?, ?, ?, ?)"
+    sql_bloque = "INSERT INTO bloques (opcion_id, dia, dia_num, hora_inicio, hora_fin, salon) VALUES (?, ?, ?, ?, ?, ?)"
+    filas = []
     for bloque in bloques:
-        cursor.execute(sql_bloque, (
+        dia = Dia.desde_texto(bloque['dia'])
+        filas.append((
             id_opcion,
-            bloque['dia'],
+            dia.abreviatura,
+            int(dia),
             bloque['inicio'],
             bloque['fin'],
             bloque.get('salon', '')
         ))
+    cursor.executemany(sql_bloque, filas)
 
 def insertar_materia_completa(datos):
     """
@@ -109,204 +275,159 @@ def insertar_materia_completa(datos):
     datos['opciones'] debe contener la lista de alternativas; en su defecto
     se aceptara una estructura plana con 'bloques' y 'profesor'.
     """
-    conn = crear_conexion()
-    if conn is None:
-        return False
-
     try:
-        cursor = conn.cursor()
+        with transaccion() as cursor:
+            cursor.execute("INSERT INTO materias (nombre) VALUES (?)", (datos['nombre'],))
+            id_materia = cursor.lastrowid
 
-        cursor.execute("INSERT INTO materias (nombre) VALUES (?)", (datos['nombre'],))
-        id_materia = cursor.lastrowid
+            opciones = datos.get('opciones') or [datos]
+            for opcion in opciones:
+                _insertar_opcion_y_bloques(cursor, id_materia, opcion)
 
-        opciones = datos.get('opciones') or [datos]
-        for opcion in opciones:
-            _insertar_opcion_y_bloques(cursor, id_materia, opcion)
-
-        conn.commit()
+        marcar_datos_modificados()
         print(f"Materia '{datos['nombre']}' guardada con {len(opciones)} alternativas.")
         return True
 
-    except Error as e:
+    except (Error, ValueError) as e:
         print(f"Error al insertar: {e}")
-        conn.rollback()
         return False
-    finally:
-        conn.close()
 
 def insertar_opciones_para_materia(id_materia, opciones):
     """Agrega una o mas opciones a una materia existente."""
-    conn = crear_conexion()
-    if conn is None:
-        return False
-
     try:
-        cursor = conn.cursor()
-        for opcion in opciones:
-            _insertar_opcion_y_bloques(cursor, id_materia, opcion)
-        conn.commit()
+        with transaccion() as cursor:
+            for opcion in opciones:
+                _insertar_opcion_y_bloques(cursor, id_materia, opcion)
+        marcar_datos_modificados()
         print(f"Se agregaron {len(opciones)} opciones a la materia ID {id_materia}.")
         return True
-    except Error as e:
+    except (Error, ValueError) as e:
         print(f"Error al insertar opcion: {e}")
-        conn.rollback()
         return False
-    finally:
-        conn.close()
 
 def obtener_todas_las_materias():
     """Retorna una lista simple de nombres de materias para mostrar en la lista."""
-    conn = crear_conexion()
     materias = []
-    if conn is not None:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT MIN(id) as id, nombre FROM materias GROUP BY nombre")
-            materias = cursor.fetchall() # Retorna lista de tuplas [(1, 'Fisica'), (2, 'Calculo')]
-        except Error as e:
-            print(f"Error al leer: {e}")
-        finally:
-            conn.close()
+    try:
+        # Retorna lista de tuplas [(1, 'Fisica'), (2, 'Calculo')]
+        materias = consultar("SELECT MIN(id) as id, nombre FROM materias GROUP BY nombre")
+    except Error as e:
+        print(f"Error al leer: {e}")
     return materias
 
 def obtener_materia_por_nombre(nombre):
     """Retorna el ID de la materia cuyo nombre coincide (sin distincion de mayusculas)."""
-    conn = crear_conexion()
-    if conn is None:
-        return None
-
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM materias WHERE LOWER(nombre) = LOWER(?) LIMIT 1", (nombre,))
-        fila = cursor.fetchone()
-        return fila[0] if fila else None
+        filas = consultar("SELECT id FROM materias WHERE LOWER(nombre) = LOWER(?) LIMIT 1", (nombre,))
+        return filas[0][0] if filas else None
     except Error as e:
         print(f"Error al buscar materia por nombre: {e}")
         return None
-    finally:
-        conn.close()
 
 def eliminar_materia(id_materia):
     """Borra una materia y todas sus coincidencias de nombre para evitar duplicados."""
-    conn = crear_conexion()
-    if conn is None:
-        return False
-
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT nombre FROM materias WHERE id = ?", (id_materia,))
-        fila = cursor.fetchone()
-        if not fila:
-            return False
-
-        nombre = fila[0]
-        cursor.execute("DELETE FROM materias WHERE LOWER(nombre) = LOWER(?)", (nombre,))
-        conn.commit()
+        with transaccion() as cursor:
+            cursor.execute("SELECT nombre FROM materias WHERE id = ?", (id_materia,))
+            fila = cursor.fetchone()
+            if not fila:
+                return False
+
+            nombre = fila[0]
+            cursor.execute("DELETE FROM materias WHERE LOWER(nombre) = LOWER(?)", (nombre,))
+        marcar_datos_modificados()
         return True
     except Error as e:
         print(f"Error al eliminar: {e}")
         return False
-    finally:
-        conn.close()
 
 def obtener_materia_con_opciones(id_materia):
-    """Recupera la materia y todas sus alternativas con sus bloques."""
-    conn = crear_conexion()
-    if not conn:
-        return None
-
+    """
+    Recupera la materia y todas sus alternativas con sus bloques.
+    Las opciones y sus bloques se leen en una sola consulta (LEFT JOIN, para
+    no perder opciones sin bloques) y se agrupan en una pasada.
+    """
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT nombre FROM materias WHERE id = ?", (id_materia,))
-        fila = cursor.fetchone()
-        if not fila:
-            return None
-
-        nombre = fila[0]
-        cursor.execute("SELECT id FROM materias WHERE LOWER(nombre) = LOWER(?) ORDER BY id", (nombre,))
-        ids_materias = [id_row[0] for id_row in cursor.fetchall()]
-        if not ids_materias:
-            return None
-
-        query_opciones = f"""
-            SELECT o.id, o.profesor, o.salon
-            FROM opciones o
-            WHERE o.materia_id IN ({','.join(['?'] * len(ids_materias))})
-            ORDER BY o.id ASC
-        """
-        cursor.execute(query_opciones, ids_materias)
-        opciones_rows = cursor.fetchall()
-
-        resultado = {"id": ids_materias[0], "nombre": nombre, "opciones": []}
-
-        for opcion_id, profesor, salon_opcion in opciones_rows:
+        with transaccion() as cursor:
             cursor.execute(
-                "SELECT dia, hora_inicio, hora_fin, salon FROM bloques WHERE opcion_id = ?",
-                (opcion_id,)
+                """
+                SELECT id, nombre FROM materias
+                WHERE LOWER(nombre) = (SELECT LOWER(nombre) FROM materias WHERE id = ?)
+                ORDER BY id
+                """,
+                (id_materia,)
             )
-            bloques = [
-                {
-                    "dia": dia,
+            filas_materias = cursor.fetchall()
+            if not filas_materias:
+                return None
+
+            ids_materias = [fila[0] for fila in filas_materias]
+            nombre = next(n for i, n in filas_materias if i == id_materia)
+
+            query = f"""
+                SELECT o.id, o.profesor, o.salon,
+                       b.dia, b.dia_num, b.hora_inicio, b.hora_fin, b.salon
+                FROM opciones o
+                LEFT JOIN bloques b ON b.opcion_id = o.id
+                WHERE o.materia_id IN ({','.join(['?'] * len(ids_materias))})
+                ORDER BY o.id ASC, b.id ASC
+            """
+            cursor.execute(query, ids_materias)
+
+            resultado = {"id": ids_materias[0], "nombre": nombre, "opciones": []}
+            opcion_actual = None
+            for (opcion_id, profesor, salon_opcion,
+                 dia, dia_num, inicio, fin, salon) in cursor.fetchall():
+                if opcion_actual is None or opcion_actual["id"] != opcion_id:
+                    opcion_actual = {"id": opcion_id, "profesor": profesor, "bloques": []}
+                    resultado["opciones"].append(opcion_actual)
+                if inicio is None:
+                    continue # Opcion sin bloques
+                opcion_actual["bloques"].append({
+                    "dia": DIAS[dia_num] if dia_num is not None else dia,
                     "inicio": inicio,
                     "fin": fin,
                     "salon": salon if salon else salon_opcion
-                }
-                for dia, inicio, fin, salon in cursor.fetchall()
-            ]
-
-            resultado["opciones"].append({
-                "id": opcion_id,
-                "profesor": profesor,
-                "bloques": bloques
-            })
+                })
 
-        return resultado
+            return resultado
 
     except Error as e:
         print(f"Error al obtener materia: {e}")
         return None
-    finally:
-        conn.close()
 
 def actualizar_materia_existente(id_materia, nuevos_datos):
     """Actualiza la materia y reemplaza todas sus alternativas por las nuevas."""
-    conn = crear_conexion()
-    if conn is None:
-        return False
-
     try:
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT nombre FROM materias WHERE id = ?", (id_materia,))
-        fila = cursor.fetchone()
-        if not fila:
-            return False
-
-        nombre_actual = fila[0]
-        cursor.execute(
-            "UPDATE materias SET nombre = ? WHERE LOWER(nombre) = LOWER(?)",
-            (nuevos_datos['nombre'], nombre_actual)
-        )
-
-        cursor.execute("SELECT id FROM materias WHERE LOWER(nombre) = LOWER(?)", (nuevos_datos['nombre'],))
-        ids_materias = [row[0] for row in cursor.fetchall()]
-        if not ids_materias:
-            return False
-
-        cursor.execute(
-            f"DELETE FROM opciones WHERE materia_id IN ({','.join(['?'] * len(ids_materias))})",
-            ids_materias
-        )
-
-        id_base = ids_materias[0]
-        for opcion in nuevos_datos.get('opciones', []):
-            _insertar_opcion_y_bloques(cursor, id_base, opcion)
-
-        conn.commit()
+        with transaccion() as cursor:
+            cursor.execute("SELECT nombre FROM materias WHERE id = ?", (id_materia,))
+            fila = cursor.fetchone()
+            if not fila:
+                return False
+
+            nombre_actual = fila[0]
+            cursor.execute(
+                "UPDATE materias SET nombre = ? WHERE LOWER(nombre) = LOWER(?)",
+                (nuevos_datos['nombre'], nombre_actual)
+            )
+
+            cursor.execute("SELECT id FROM materias WHERE LOWER(nombre) = LOWER(?)", (nuevos_datos['nombre'],))
+            ids_materias = [row[0] for row in cursor.fetchall()]
+            if not ids_materias:
+                cursor.connection.rollback() # No confirmar el UPDATE a medias
+                return False
+
+            cursor.execute(
+                f"DELETE FROM opciones WHERE materia_id IN ({','.join(['?'] * len(ids_materias))})",
+                ids_materias
+            )
+
+            id_base = ids_materias[0]
+            for opcion in nuevos_datos.get('opciones', []):
+                _insertar_opcion_y_bloques(cursor, id_base, opcion)
+
+        marcar_datos_modificados()
         return True
-    except Error as e:
+    except (Error, ValueError) as e:
         print(f"Error al actualizar materia: {e}")
-        conn.rollback()
         return False
-    finally:
-        conn.close()
@@ -1,16 +1,61 @@
-from dataclasses import dataclass
-from typing import List, Tuple
+from array import array
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from enum import IntEnum
+import heapq
+import itertools
+import logging
+import os
+import unicodedata
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# --- Dias de la Semana ---
+# El motor, la base de datos y el grid trabajan con el dia como entero
+# (Dia.LUN = 0 ... Dia.DOM = 6). El texto solo se usa para mostrar.
+
+DIAS = ("Lun", "Mar", "Mie", "Jue", "Vie", "Sab", "Dom")
+
+class Dia(IntEnum):
+    LUN = 0
+    MAR = 1
+    MIE = 2
+    JUE = 3
+    VIE = 4
+    SAB = 5
+    DOM = 6
+
+    @property
+    def abreviatura(self) -> str:
+        return DIAS[self]
+
+    @classmethod
+    def desde_texto(cls, texto: str) -> "Dia":
+        """Acepta 'Lun', 'Lunes', 'MIERCOLES', 'Sabado'... con o sin tildes (bastan 3 letras)."""
+        sin_acentos = unicodedata.normalize('NFKD', texto.strip()).encode('ascii', 'ignore').decode()
+        dia = _DIAS_POR_CLAVE.get(sin_acentos[:3].lower())
+        if dia is None:
+            raise ValueError(f"Dia no reconocido: {texto!r}")
+        return dia
+
+_DIAS_POR_CLAVE = {abreviatura.lower(): Dia(i) for i, abreviatura in enumerate(DIAS)}
 
 # --- Estructuras de Datos en Memoria ---
+# slots=True: sin __dict__ por instancia, cada objeto ocupa bastante menos.
 
-@dataclass
+@dataclass(slots=True)
 class Bloque:
-    dia: str          # Ej: "Lunes"
+    dia: int          # Dia.LUN .. Dia.DOM (un texto como "Lunes" se convierte solo)
     hora_inicio: int  # Minutos desde las 00:00 (Ej: 13:00 -> 780)
     hora_fin: int     # Minutos desde las 00:00
     salon: str        # Salon especifico del bloque
 
-@dataclass
+    def __post_init__(self):
+        if isinstance(self.dia, str):
+            self.dia = Dia.desde_texto(self.dia)
+
+@dataclass(slots=True)
 class Opcion:
     id_opcion: int
     nombre_materia: str
@@ -18,12 +63,73 @@ class Opcion:
     salon: str
     bloques: List[Bloque] # Una opcion puede tener varios bloques (Lunes y Miercoles)
 
-@dataclass
+@dataclass(slots=True)
 class Materia:
     id_materia: int
     nombre: str
     opciones: List[Opcion] # Lista de grupos disponibles para esta materia
 
+@dataclass(slots=True)
+class EstadoBusqueda:
+    """
+    Progreso de una busqueda en curso, compartido con quien la lanzo
+    (por ejemplo un hilo de la interfaz que lo consulta periodicamente).
+    Poner cancelado=True detiene la busqueda en el siguiente nodo.
+    """
+    nodos: int = 0
+    soluciones: int = 0
+    podas: int = 0 # Ramas abandonadas (forward checking o cota)
+    cancelado: bool = False
+
+# --- Traza de Conflictos (opcional) ---
+# Desactivada por defecto: el motor solo consulta _traza cuando ya encontro un
+# choque, asi que sin traza activa no hay costo en el camino caliente.
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class Conflicto:
+    opcion_a: Optional[int] # id_opcion (None si el choque se vio solo entre bloques)
+    opcion_b: Optional[int]
+    dia: int                # Dia.LUN .. Dia.DOM
+    inicio: int             # Intervalo solapado, en minutos
+    fin: int
+
+class TrazaConflictos:
+    """
+    Guarda los ultimos 'limite' choques detectados. Con registrar_en_log=True
+    tambien se emite cada uno al logger 'engine' con nivel DEBUG.
+    """
+
+    def __init__(self, limite: int = 1000, registrar_en_log: bool = False):
+        self.conflictos = deque(maxlen=limite)
+        self.total = 0 # Incluye los que ya salieron de la cola
+        self.registrar_en_log = registrar_en_log
+
+    def registrar(self, opcion_a, opcion_b, dia, inicio, fin):
+        self.total += 1
+        self.conflictos.append(Conflicto(opcion_a, opcion_b, dia, inicio, fin))
+        if self.registrar_en_log:
+            logger.debug("Conflicto %s: opcion %s vs %s, %s - %s", DIAS[dia], opcion_a, opcion_b,
+                         minutos_a_hora(inicio), minutos_a_hora(fin))
+
+_traza: Optional[TrazaConflictos] = None
+
+def activar_traza_conflictos(limite: int = 1000, registrar_en_log: bool = False) -> TrazaConflictos:
+    """
+    Empieza a registrar choques y devuelve la traza para consultarla. Los
+    choques se ven al construir el indice, asi que se descarta el guardado
+    (ver obtener_indice_compatibilidad) y la siguiente busqueda lo rehace.
+    """
+    global _traza, _indice_en_cache
+    _traza = TrazaConflictos(limite, registrar_en_log)
+    _indice_en_cache = None
+    return _traza
+
+def desactivar_traza_conflictos():
+    global _traza
+    _traza = None
+
 # --- Motor de Logica ---
 
 def convertir_hora_a_minutos(hora_str: str) -> int:
@@ -47,16 +153,34 @@ def hay_choque(bloque1: Bloque, bloque2: Bloque) -> bool:
     fin_min = min(bloque1.hora_fin, bloque2.hora_fin)
     
     choca = inicio_max < fin_min
-    
-    # --- DEBUG: Si hay choque, avisa en consola ---
-    if choca:
-        print(f"   CONFLICTO DETECTADO: {bloque1.dia}")
-        print(f"   Bloque A: {minutos_a_hora(bloque1.hora_inicio)} - {minutos_a_hora(bloque1.hora_fin)}")
-        print(f"   Bloque B: {minutos_a_hora(bloque2.hora_inicio)} - {minutos_a_hora(bloque2.hora_fin)}")
-    # ----------------------------------------------
-    
+    if choca and _traza is not None:
+        _traza.registrar(None, None, bloque1.dia, inicio_max, fin_min)
     return choca
 
+# --- Mascaras de Ocupacion ---
+# Cada opcion se resume en un entero donde cada bit es un minuto de la semana
+# (dia * 1440 + minuto). Dos opciones chocan si y solo si sus mascaras
+# comparten algun bit, asi que validar un candidato es un solo AND.
+
+MINUTOS_POR_DIA = 24 * 60
+
+def _mascara_intervalo(dia: int, hora_inicio: int, hora_fin: int) -> int:
+    duracion = hora_fin - hora_inicio
+    if duracion <= 0:
+        return 0
+    return ((1 << duracion) - 1) << (dia * MINUTOS_POR_DIA + hora_inicio)
+
+def mascara_bloque(bloque: Bloque) -> int:
+    """Convierte un bloque en su mascara de minutos ocupados."""
+    return _mascara_intervalo(bloque.dia, bloque.hora_inicio, bloque.hora_fin)
+
+def mascara_opcion(opcion: Opcion) -> int:
+    """Une las mascaras de todos los bloques de la opcion."""
+    mascara = 0
+    for bloque in opcion.bloques:
+        mascara |= mascara_bloque(bloque)
+    return mascara
+
 def validar_horario(horario_actual: List[Opcion], nueva_opcion: Opcion) -> bool:
     """Revisa si la nueva_opcion choca con algo que ya esta en el horario."""
     for opcion_existente in horario_actual:
@@ -66,49 +190,1049 @@ def validar_horario(horario_actual: List[Opcion], nueva_opcion: Opcion) -> bool:
                     return False # Hay conflicto
     return True
 
-def generar_combinaciones(materias: List[Materia]) -> List[List[Opcion]]:
+# --- Indice de Compatibilidad ---
+
+def firma_catalogo(materias: List[Materia]) -> tuple:
     """
-    Algoritmo principal (Backtracking).
-    Genera todas las combinaciones validas de horarios.
+    Resume la estructura del catalogo (materias, opciones y bloques).
+    Dos catalogos con la misma firma tienen exactamente los mismos choques.
     """
-    resultados = []
+    return tuple(
+        tuple(
+            tuple((b.dia, b.hora_inicio, b.hora_fin) for b in opcion.bloques)
+            for opcion in materia.opciones
+        )
+        for materia in materias
+    )
+
+class IndiceCompatibilidad:
+    """
+    Compatibilidades precalculadas entre todas las opciones del catalogo.
+
+    Las opciones se numeran en orden (materia por materia) y cada una guarda
+    un bitset con las opciones de OTRAS materias con las que no choca.
+
+    Los bloques se guardan en arreglos enteros paralelos (dia, inicio, fin):
+    los de la opcion i ocupan las posiciones desde[i] .. desde[i + 1] - 1.
+    """
+
+    def __init__(self, materias: List[Materia]):
+        self.firma = firma_catalogo(materias)
+        self.rangos: List[range] = []
+        self.bits_materia: List[int] = [] # Bitset con todas las opciones de cada materia
+        self.desde = array('I', [0])
+        self.dias = array('H')
+        self.inicios = array('H')
+        self.fines = array('H')
+
+        for materia in materias:
+            inicio = len(self.desde) - 1
+            for opcion in materia.opciones:
+                for bloque in opcion.bloques:
+                    self.dias.append(bloque.dia)
+                    self.inicios.append(bloque.hora_inicio)
+                    self.fines.append(bloque.hora_fin)
+                self.desde.append(len(self.dias))
+            self.rangos.append(range(inicio, len(self.desde) - 1))
+            self.bits_materia.append(((1 << len(materia.opciones)) - 1) << inicio)
+
+        self.mascaras: List[int] = [self._calcular_mascara(i) for i in range(len(self.desde) - 1)]
+
+        self.compatibles: List[int] = [0] * len(self.mascaras)
+
+        traza = _traza
+        if traza is not None:
+            ids = [opcion.id_opcion for materia in materias for opcion in materia.opciones]
+
+        # Cada par de opciones de materias distintas se evalua una sola vez
+        for a, rango_a in enumerate(self.rangos):
+            for rango_b in self.rangos[a + 1:]:
+                for i in rango_a:
+                    mascara_i = self.mascaras[i]
+                    for j in rango_b:
+                        if not (mascara_i & self.mascaras[j]):
+                            self.compatibles[i] |= 1 << j
+                            self.compatibles[j] |= 1 << i
+                        elif traza is not None:
+                            self._registrar_choque(traza, i, j, ids[i], ids[j])
+
+    def bloques(self, i: int) -> Iterator[Tuple[int, int, int]]:
+        """Bloques de la opcion i como tuplas (dia, inicio, fin)."""
+        for b in range(self.desde[i], self.desde[i + 1]):
+            yield self.dias[b], self.inicios[b], self.fines[b]
+
+    def _calcular_mascara(self, i: int) -> int:
+        mascara = 0
+        for dia, inicio, fin in self.bloques(i):
+            mascara |= _mascara_intervalo(dia, inicio, fin)
+        return mascara
+
+    def _registrar_choque(self, traza: TrazaConflictos, i: int, j: int, id_i: int, id_j: int):
+        for dia_i, inicio_i, fin_i in self.bloques(i):
+            for dia_j, inicio_j, fin_j in self.bloques(j):
+                inicio, fin = max(inicio_i, inicio_j), min(fin_i, fin_j)
+                if dia_i == dia_j and inicio < fin:
+                    traza.registrar(id_i, id_j, dia_i, inicio, fin)
 
-    def backtrack(indice_materia, horario_actual):
-        # Caso base: Si ya revisamos todas las materias, guardamos el horario
-        if indice_materia == len(materias):
-            resultados.append(list(horario_actual))
+    def son_compatibles(self, i: int, j: int) -> bool:
+        """True si las opciones i y j (indices globales) pueden ir juntas."""
+        return bool(self.compatibles[i] >> j & 1)
+
+    def opciones_viables(self, permitidas: int = -1) -> int:
+        """
+        Bitset de opciones (de entre las permitidas) que tienen al menos un
+        companero permitido y compatible en cada una de las otras materias.
+        Las demas nunca forman un horario.
+        """
+        viables = 0
+        for k, rango in enumerate(self.rangos):
+            otras = [bits & permitidas for m, bits in enumerate(self.bits_materia) if m != k]
+            for i in rango:
+                if permitidas >> i & 1 and all(self.compatibles[i] & bits for bits in otras):
+                    viables |= 1 << i
+        return viables
+
+    def minutos_por_dia(self, i: int) -> List[Tuple[int, int]]:
+        """(dia, minutos ocupados) de cada dia en que la opcion i tiene clase."""
+        dia_completo = (1 << MINUTOS_POR_DIA) - 1
+        dias = sorted(set(self.dias[self.desde[i]:self.desde[i + 1]]))
+        return [
+            (dia, ((self.mascaras[i] >> (dia * MINUTOS_POR_DIA)) & dia_completo).bit_count())
+            for dia in dias
+        ]
+
+    def grupos_independientes(self, permitidas: int = -1) -> List[List[int]]:
+        """
+        Agrupa las materias (por posicion) en componentes independientes:
+        ninguna opcion permitida de un grupo choca con una de otro grupo,
+        asi que cada grupo puede resolverse por separado.
+        """
+        padre = list(range(len(self.rangos)))
+
+        def raiz(a):
+            while padre[a] != a:
+                padre[a] = padre[padre[a]]
+                a = padre[a]
+            return a
+
+        for a, rango_a in enumerate(self.rangos):
+            for b in range(a + 1, len(self.rangos)):
+                objetivo = self.bits_materia[b] & permitidas
+                if any(self.compatibles[i] & objetivo != objetivo
+                       for i in rango_a if permitidas >> i & 1):
+                    padre[raiz(b)] = raiz(a)
+
+        grupos = {}
+        for m in range(len(self.rangos)):
+            grupos.setdefault(raiz(m), []).append(m)
+        return list(grupos.values())
+
+    def clases_por_mascara(self, k: int, permitidas: int = -1) -> List[Tuple[int, int]]:
+        """
+        Agrupa las opciones permitidas de la materia k que ocupan exactamente
+        los mismos minutos. Como chocan con las mismas opciones, basta con un
+        representante. Devuelve pares (representante, bitset de la clase).
+        """
+        clases = {}
+        for i in self.rangos[k]:
+            if permitidas >> i & 1:
+                clase = clases.setdefault(self.mascaras[i], [i, 0])
+                clase[1] |= 1 << i
+        return [tuple(clase) for clase in clases.values()]
+
+_indice_en_cache = None
+
+def obtener_indice_compatibilidad(materias: List[Materia]) -> IndiceCompatibilidad:
+    """Devuelve el indice del catalogo, reutilizando el anterior si no cambio."""
+    global _indice_en_cache
+    firma = firma_catalogo(materias)
+    if _indice_en_cache is None or _indice_en_cache.firma != firma:
+        _indice_en_cache = IndiceCompatibilidad(materias)
+    return _indice_en_cache
+
+# --- Restricciones ---
+# Condiciones duras que debe cumplir cada horario. Casi todas dependen de una
+# sola opcion, asi que se aplican ANTES de buscar: las opciones que no las
+# cumplen se quitan del bitset de opciones permitidas y nunca se exploran.
+# El tope de horas por dia depende de la combinacion y se revisa durante el
+# backtracking, descartando las opciones pendientes que ya no caben.
+
+@dataclass(slots=True)
+class Restricciones:
+    ventanas_bloqueadas: List[Tuple[int, int, int]] = field(default_factory=list) # (dia, inicio, fin) en minutos
+    dias_libres: List[int] = field(default_factory=list) # Dias sin ninguna clase
+    profesores_requeridos: Dict[str, str] = field(default_factory=dict) # Materia -> unico profesor aceptado
+    profesores_prohibidos: List[str] = field(default_factory=list)
+    max_minutos_dia: Optional[int] = None # Tope de minutos de clase en un mismo dia
+
+    def vacia(self) -> bool:
+        return not (self.ventanas_bloqueadas or self.dias_libres or self.profesores_requeridos
+                    or self.profesores_prohibidos or self.max_minutos_dia is not None)
+
+    def mascara_bloqueada(self) -> int:
+        """Minutos de la semana en los que no puede haber clase."""
+        mascara = 0
+        for dia, inicio, fin in self.ventanas_bloqueadas:
+            mascara |= _mascara_intervalo(dia, inicio, fin)
+        for dia in self.dias_libres:
+            mascara |= _mascara_intervalo(dia, 0, MINUTOS_POR_DIA)
+        return mascara
+
+def _normalizar_nombre(texto: str) -> str:
+    return " ".join((texto or "").split()).lower()
+
+def opciones_permitidas(materias: List[Materia], indice: IndiceCompatibilidad,
+                        restricciones: Optional[Restricciones]) -> int:
+    """
+    Bitset (indices globales de opcion) de las opciones que cumplen por si
+    solas las restricciones: no tocan ventanas bloqueadas ni dias libres,
+    su profesor no esta prohibido ni es otro que el requerido para su
+    materia, y no pasan del tope diario. Sin restricciones devuelve -1 (todas).
+    """
+    if restricciones is None or restricciones.vacia():
+        return -1
+
+    bloqueada = restricciones.mascara_bloqueada()
+    prohibidos = {_normalizar_nombre(p) for p in restricciones.profesores_prohibidos}
+    requeridos = {
+        _normalizar_nombre(materia): _normalizar_nombre(profesor)
+        for materia, profesor in restricciones.profesores_requeridos.items()
+    }
+    tope = restricciones.max_minutos_dia
+
+    permitidas = 0
+    i = 0
+    for materia in materias:
+        requerido = requeridos.get(_normalizar_nombre(materia.nombre))
+        for opcion in materia.opciones:
+            profesor = _normalizar_nombre(opcion.profesor)
+            if (not indice.mascaras[i] & bloqueada
+                    and profesor not in prohibidos
+                    and requerido in (None, profesor)
+                    and (tope is None or all(m <= tope for _, m in indice.minutos_por_dia(i)))):
+                permitidas |= 1 << i
+            i += 1
+    return permitidas
+
+class _TopeDiario:
+    """
+    Minutos de clase por dia de la rama actual. Al elegir una opcion quita
+    de las permitidas las que ya no caben en alguno de sus dias.
+    """
+
+    def __init__(self, indice: IndiceCompatibilidad, maximo: int):
+        self.maximo = maximo
+        self.cargas = [indice.minutos_por_dia(i) for i in range(len(indice.mascaras))]
+        self.usado = [0] * len(DIAS)
+
+        # Por dia: minutos de cada opcion (ordenados) y, para cada posicion,
+        # el bitset de las opciones de esa posicion en adelante
+        por_dia = [[] for _ in DIAS]
+        for i, carga in enumerate(self.cargas):
+            for dia, minutos in carga:
+                por_dia[dia].append((minutos, i))
+        self.minutos: List[List[int]] = []
+        self.mayores: List[List[int]] = []
+        for lista in por_dia:
+            lista.sort()
+            sufijos = [0] * (len(lista) + 1)
+            for j in range(len(lista) - 1, -1, -1):
+                sufijos[j] = sufijos[j + 1] | 1 << lista[j][1]
+            self.minutos.append([minutos for minutos, _ in lista])
+            self.mayores.append(sufijos)
+
+    def agregar(self, i: int, permitidas: int) -> int:
+        """Suma la opcion i y devuelve 'permitidas' sin las opciones que ya no caben."""
+        for dia, minutos in self.cargas[i]:
+            self.usado[dia] += minutos
+            libres = self.maximo - self.usado[dia]
+            permitidas &= ~self.mayores[dia][bisect_right(self.minutos[dia], libres)]
+        return permitidas
+
+    def quitar(self, i: int):
+        for dia, minutos in self.cargas[i]:
+            self.usado[dia] -= minutos
+
+def _preparar_restricciones(materias: List[Materia], indice: IndiceCompatibilidad,
+                            restricciones: Optional[Restricciones]) -> Tuple[int, Optional[int]]:
+    """(bitset de opciones permitidas, tope de minutos por dia) para la busqueda."""
+    permitidas = opciones_permitidas(materias, indice, restricciones)
+    return permitidas, restricciones.max_minutos_dia if restricciones is not None else None
+
+def _buscar_indices(indice: IndiceCompatibilidad,
+                    ordenar_por_restriccion: bool = False,
+                    prefijo: Tuple[int, ...] = (),
+                    estado: Optional[EstadoBusqueda] = None,
+                    filtro: int = -1,
+                    max_minutos_dia: Optional[int] = None,
+                    reanudar: Optional[Tuple[int, ...]] = None) -> Iterator[Tuple[int, ...]]:
+    """
+    Backtracking con forward checking sobre el indice de compatibilidad.
+    Produce cada horario valido como una tupla de indices globales de
+    opcion, uno por materia y en el orden original de materias.
+    Si se da un prefijo, las primeras materias quedan fijas en esas opciones
+    y solo se explora ese subarbol. Si se da un estado, se actualizan sus
+    contadores y se respeta su bandera de cancelacion. Con 'reanudar' (un
+    horario que esta misma busqueda ya produjo) solo se entregan los que
+    vienen despues de el.
+
+    Solo se usan las opciones del bitset 'filtro' (ver opciones_permitidas)
+    y, con max_minutos_dia, ningun dia pasa de ese tope.
+
+    Tras cada eleccion se descartan las opciones de las materias pendientes
+    que ya chocan (o ya no caben en el dia), y la rama se abandona en cuanto
+    alguna se queda sin opciones. Con ordenar_por_restriccion=True se elige
+    siempre primero la materia con menos opciones vivas: se obtienen los
+    mismos horarios pero en otro orden de aparicion.
+    """
+    rangos = indice.rangos
+    compatibles = indice.compatibles
+    bits_materia = indice.bits_materia
+    horario_actual = [0] * len(rangos)
+    tope = _TopeDiario(indice, max_minutos_dia) if max_minutos_dia is not None else None
+
+    def backtrack(pendientes, permitidas):
+        if estado is not None:
+            if estado.cancelado:
+                return
+            estado.nodos += 1
+
+        # Caso base: Si ya revisamos todas las materias, entregamos el horario
+        if not pendientes:
+            if estado is not None:
+                estado.soluciones += 1
+            yield tuple(horario_actual)
             return
 
-        materia_actual = materias[indice_materia]
-        
+        if ordenar_por_restriccion:
+            # La materia mas restringida (menos opciones vivas) va primero
+            k = min(pendientes, key=lambda m: (permitidas & bits_materia[m]).bit_count())
+        else:
+            k = pendientes[0]
+        resto = [m for m in pendientes if m != k]
+
         # Intentar con cada opcion (profesor/grupo) de la materia actual
-        for opcion in materia_actual.opciones:
-            if validar_horario(horario_actual, opcion):
-                # Si no choca, agregamos y pasamos a la siguiente materia
-                horario_actual.append(opcion)
-                backtrack(indice_materia + 1, horario_actual)
-                horario_actual.pop() # Backtrack: quitamos para probar otra opcion
-
-    backtrack(0, [])
+        for i in rangos[k]:
+            if permitidas >> i & 1:
+                nuevas = permitidas & compatibles[i]
+                if tope is not None:
+                    nuevas = tope.agregar(i, nuevas)
+                # Forward checking: ninguna materia pendiente puede quedar vacia
+                if all(nuevas & bits_materia[m] for m in resto):
+                    horario_actual[k] = i
+                    yield from backtrack(resto, nuevas)
+                elif estado is not None:
+                    estado.podas += 1
+                if tope is not None:
+                    tope.quitar(i)
+
+    def continuar(pendientes, permitidas):
+        """
+        Baja solo por el camino de 'reanudar': en cada nivel salta las
+        opciones anteriores a la suya y explora completas las posteriores.
+        Aparte de backtrack para no revisar 'reanudar' en cada nodo.
+        """
+        if not pendientes:
+            return # Es el propio 'reanudar', ya entregado
+        if ordenar_por_restriccion:
+            k = min(pendientes, key=lambda m: (permitidas & bits_materia[m]).bit_count())
+        else:
+            k = pendientes[0]
+        resto = [m for m in pendientes if m != k]
+
+        for i in rangos[k]:
+            if i >= reanudar[k] and permitidas >> i & 1:
+                nuevas = permitidas & compatibles[i]
+                if tope is not None:
+                    nuevas = tope.agregar(i, nuevas)
+                if all(nuevas & bits_materia[m] for m in resto):
+                    horario_actual[k] = i
+                    yield from (continuar if i == reanudar[k] else backtrack)(resto, nuevas)
+                if tope is not None:
+                    tope.quitar(i)
+
+    permitidas = indice.opciones_viables(filtro)
+    for k, i in enumerate(prefijo):
+        if not permitidas >> i & 1:
+            return # El prefijo ya tiene un choque (o no cumple las restricciones)
+        horario_actual[k] = i
+        permitidas &= compatibles[i]
+        if tope is not None:
+            permitidas = tope.agregar(i, permitidas)
+
+    pendientes = list(range(len(prefijo), len(rangos)))
+    if all(permitidas & bits_materia[m] for m in pendientes):
+        yield from (backtrack if reanudar is None else continuar)(pendientes, permitidas)
+
+class ResultadosCompactos:
+    """
+    Horarios guardados como indices de opcion en un unico arreglo plano
+    (un indice por materia, 'ancho' posiciones por horario) en vez de
+    listas de objetos. Se usa como una lista de solo lectura: al acceder a
+    un elemento se reconstruye la lista de Opcion de ese horario.
+    """
+
+    def __init__(self, materias: List[Materia]):
+        self.opciones = [opcion for materia in materias for opcion in materia.opciones]
+        self.ancho = len(materias)
+        self.indices = array('H' if len(self.opciones) <= 0xFFFF else 'I')
+        self._cantidad = 0 # Aparte del arreglo: con 0 materias el ancho es 0
+
+    def agregar(self, seleccion: Tuple[int, ...]):
+        self.indices.extend(seleccion)
+        self._cantidad += 1
+
+    def extender(self, selecciones):
+        for seleccion in selecciones:
+            self.agregar(seleccion)
+
+    def seleccion(self, posicion: int) -> Tuple[int, ...]:
+        """Indices globales de las opciones del horario en 'posicion'."""
+        if posicion < 0:
+            posicion += self._cantidad
+        if not 0 <= posicion < self._cantidad:
+            raise IndexError("horario fuera de rango")
+        inicio = posicion * self.ancho
+        return tuple(self.indices[inicio:inicio + self.ancho])
+
+    def __len__(self) -> int:
+        return self._cantidad
+
+    def __getitem__(self, posicion: int) -> List[Opcion]:
+        return [self.opciones[i] for i in self.seleccion(posicion)]
+
+def iterar_selecciones(materias: List[Materia],
+                       indice: Optional[IndiceCompatibilidad] = None,
+                       ordenar_por_restriccion: bool = False,
+                       estado: Optional[EstadoBusqueda] = None,
+                       restricciones: Optional[Restricciones] = None) -> Iterator[Tuple[int, ...]]:
+    """
+    Igual que iterar_combinaciones pero entrega cada horario como tupla de
+    indices globales de opcion (ver ResultadosCompactos), sin crear listas.
+    """
+    if indice is None:
+        indice = obtener_indice_compatibilidad(materias)
+    filtro, max_minutos_dia = _preparar_restricciones(materias, indice, restricciones)
+    return _buscar_indices(indice, ordenar_por_restriccion, estado=estado,
+                           filtro=filtro, max_minutos_dia=max_minutos_dia)
+
+def iterar_combinaciones(materias: List[Materia],
+                         indice: Optional[IndiceCompatibilidad] = None,
+                         ordenar_por_restriccion: bool = False,
+                         estado: Optional[EstadoBusqueda] = None,
+                         restricciones: Optional[Restricciones] = None) -> Iterator[List[Opcion]]:
+    """
+    Version perezosa de generar_combinaciones: entrega los horarios validos
+    uno a uno, sin guardar la lista completa en memoria.
+    Si no se pasa un indice se usa (o construye) el del catalogo actual.
+    """
+    opciones = [opcion for materia in materias for opcion in materia.opciones]
+    for seleccion in iterar_selecciones(materias, indice, ordenar_por_restriccion, estado, restricciones):
+        yield [opciones[i] for i in seleccion]
+
+def generar_combinaciones(materias: List[Materia],
+                          indice: Optional[IndiceCompatibilidad] = None,
+                          ordenar_por_restriccion: bool = False,
+                          restricciones: Optional[Restricciones] = None) -> List[List[Opcion]]:
+    """
+    Algoritmo principal (Backtracking).
+    Genera todas las combinaciones validas de horarios (que ademas cumplan
+    las restricciones, si se dan).
+    Ver iterar_combinaciones para obtenerlas de forma perezosa y
+    generar_combinaciones_compactas para guardar millones de horarios.
+    """
+    return list(iterar_combinaciones(materias, indice, ordenar_por_restriccion,
+                                     restricciones=restricciones))
+
+def generar_combinaciones_compactas(materias: List[Materia],
+                                    indice: Optional[IndiceCompatibilidad] = None,
+                                    ordenar_por_restriccion: bool = False,
+                                    restricciones: Optional[Restricciones] = None) -> ResultadosCompactos:
+    """Genera todas las combinaciones guardandolas en un ResultadosCompactos."""
+    resultados = ResultadosCompactos(materias)
+    resultados.extender(iterar_selecciones(materias, indice, ordenar_por_restriccion,
+                                           restricciones=restricciones))
     return resultados
 
+# --- Generacion en Paralelo ---
+# El arbol se reparte por las opciones de las primeras materias. Cada proceso
+# recibe el indice una sola vez y devuelve tuplas de indices de opcion
+# (no objetos), que se traducen a Opcion en el proceso principal.
+# Un subarbol se explora en tramos de a lo sumo LOTE_PARALELO horarios (cada
+# tramo reanuda donde termino el anterior) y solo VENTANA_PARALELO subarboles
+# por proceso estan en curso a la vez: la memoria no depende del total y
+# cerrar el generador no espera a que se recorra todo el arbol.
+
+LOTE_PARALELO = 5000
+VENTANA_PARALELO = 2
+_TRAMOS_POR_SUBARBOL = 2 # Tramos ya calculados que puede tener guardados un subarbol
+
+_indice_trabajador = None
+
+def _inicializar_trabajador(indice: IndiceCompatibilidad, ordenar_por_restriccion: bool,
+                            filtro: int = -1, max_minutos_dia: Optional[int] = None):
+    global _indice_trabajador
+    _indice_trabajador = (indice, ordenar_por_restriccion, filtro, max_minutos_dia)
+
+def _explorar_subarbol(prefijo: Tuple[int, ...],
+                       reanudar: Optional[Tuple[int, ...]] = None) -> Tuple[List[Tuple[int, ...]], bool]:
+    """Siguiente tramo del subarbol y si con el se termino."""
+    indice, ordenar_por_restriccion, filtro, max_minutos_dia = _indice_trabajador
+    busqueda = _buscar_indices(indice, ordenar_por_restriccion, prefijo, filtro=filtro,
+                               max_minutos_dia=max_minutos_dia, reanudar=reanudar)
+    tramo = list(itertools.islice(busqueda, LOTE_PARALELO))
+    return tramo, len(tramo) < LOTE_PARALELO
+
+class _Subarbol:
+    """Tramos de un prefijo: el que se esta calculando y los ya recibidos."""
+    __slots__ = ('prefijo', 'pendiente', 'listos', 'ultimo', 'terminado')
+
+    def __init__(self, prefijo):
+        self.prefijo = prefijo
+        self.pendiente = None # Future del siguiente tramo
+        self.listos = deque()
+        self.ultimo = None    # Ultimo horario recibido (de ahi se reanuda)
+        self.terminado = False
+
+def _prefijos(indice: IndiceCompatibilidad, profundidad: int, filtro: int = -1) -> List[Tuple[int, ...]]:
+    """
+    Combinaciones compatibles de las primeras 'profundidad' materias, en orden.
+    El tope diario no se revisa aqui: cada subarbol descarta su prefijo si no cabe.
+    """
+    viables = indice.opciones_viables(filtro)
+    prefijos = [((), viables)]
+    for k in range(profundidad):
+        prefijos = [
+            (prefijo + (i,), permitidas & indice.compatibles[i])
+            for prefijo, permitidas in prefijos
+            for i in indice.rangos[k]
+            if permitidas >> i & 1
+        ]
+    return [prefijo for prefijo, _ in prefijos]
+
+def iterar_combinaciones_paralelo(materias: List[Materia],
+                                  procesos: Optional[int] = None,
+                                  profundidad: int = 1,
+                                  indice: Optional[IndiceCompatibilidad] = None,
+                                  ordenar_por_restriccion: bool = False,
+                                  restricciones: Optional[Restricciones] = None) -> Iterator[List[Opcion]]:
+    """
+    Igual que iterar_combinaciones pero repartiendo los subarboles de las
+    primeras 'profundidad' materias entre varios procesos. El orden de los
+    resultados es determinista y, sin ordenar_por_restriccion, el mismo que
+    en la version secuencial. Con ordenar_por_restriccion=True salen los
+    mismos horarios en otro orden: las primeras materias se reparten antes
+    de aplicar el orden por restriccion, que solo rige dentro de cada subarbol.
+    """
+    if indice is None:
+        indice = obtener_indice_compatibilidad(materias)
+
+    profundidad = min(profundidad, len(materias) - 1)
+    if procesos == 1 or profundidad < 1:
+        yield from iterar_combinaciones(materias, indice, ordenar_por_restriccion,
+                                        restricciones=restricciones)
+        return
+
+    filtro, max_minutos_dia = _preparar_restricciones(materias, indice, restricciones)
+    opciones = [opcion for materia in materias for opcion in materia.opciones]
+    ejecutor = ProcessPoolExecutor(max_workers=procesos,
+                                   initializer=_inicializar_trabajador,
+                                   initargs=(indice, ordenar_por_restriccion,
+                                             filtro, max_minutos_dia))
+
+    def pedir(subarbol):
+        """Encarga el siguiente tramo si no hay uno en curso ni demasiados guardados."""
+        if (subarbol.pendiente is None and not subarbol.terminado
+                and len(subarbol.listos) < _TRAMOS_POR_SUBARBOL):
+            subarbol.pendiente = ejecutor.submit(_explorar_subarbol, subarbol.prefijo, subarbol.ultimo)
+
+    def recibir(subarbol, esperar):
+        if subarbol.pendiente is None or not (esperar or subarbol.pendiente.done()):
+            return
+        tramo, subarbol.terminado = subarbol.pendiente.result()
+        subarbol.pendiente = None
+        if tramo:
+            subarbol.listos.append(tramo)
+            subarbol.ultimo = tramo[-1]
+        pedir(subarbol)
+
+    try:
+        prefijos = iter(_prefijos(indice, profundidad, filtro))
+        ventana = VENTANA_PARALELO * (procesos or os.cpu_count() or 1)
+        activos = deque() # Subarboles en curso, en el orden de sus prefijos
+        while True:
+            while len(activos) < ventana:
+                prefijo = next(prefijos, None)
+                if prefijo is None:
+                    break
+                subarbol = _Subarbol(prefijo)
+                pedir(subarbol)
+                activos.append(subarbol)
+            if not activos:
+                return
+
+            for subarbol in activos:
+                recibir(subarbol, esperar=False)
+            primero = activos[0]
+            if primero.listos:
+                tramo = primero.listos.popleft()
+                pedir(primero)
+                for seleccion in tramo:
+                    yield [opciones[i] for i in seleccion]
+            elif primero.terminado:
+                activos.popleft()
+            else:
+                recibir(primero, esperar=True)
+    finally:
+        # Tambien al cerrar el generador antes de tiempo: lo no empezado se
+        # descarta y lo que corre termina pronto (es un solo tramo)
+        ejecutor.shutdown(wait=True, cancel_futures=True)
+
+def generar_combinaciones_paralelo(materias: List[Materia],
+                                   procesos: Optional[int] = None,
+                                   profundidad: int = 1,
+                                   indice: Optional[IndiceCompatibilidad] = None,
+                                   ordenar_por_restriccion: bool = False,
+                                   restricciones: Optional[Restricciones] = None) -> List[List[Opcion]]:
+    """Version en lista de iterar_combinaciones_paralelo."""
+    return list(iterar_combinaciones_paralelo(materias, procesos, profundidad,
+                                              indice, ordenar_por_restriccion, restricciones))
+
+def _contar_grupo(indice: IndiceCompatibilidad, grupo: List[int], permitidas: int,
+                  estado: Optional[EstadoBusqueda] = None) -> int:
+    """Cuenta los horarios de un grupo de materias memorizando subproblemas."""
+    compatibles = indice.compatibles
+    bits_materia = indice.bits_materia
+
+    # Opciones con el mismo patron de horario se cuentan juntas
+    clases = {m: indice.clases_por_mascara(m, permitidas) for m in grupo}
+    orden = sorted(grupo, key=lambda m: len(clases[m]))
+    clases = [clases[m] for m in orden]
+    ultima = len(orden) - 1
+
+    # restantes[p] = bits de las opciones de las materias orden[p:]
+    restantes = [0] * (len(orden) + 1)
+    for p in range(ultima, -1, -1):
+        restantes[p] = restantes[p + 1] | bits_materia[orden[p]]
+
+    memo = {}
+
+    def contar(pos, permitidas):
+        if pos == ultima:
+            return (permitidas & bits_materia[orden[pos]]).bit_count()
+
+        # Solo importa que opciones de las materias pendientes siguen vivas
+        clave = (pos, permitidas & restantes[pos])
+        if clave in memo:
+            return memo[clave]
+        if estado is not None and estado.cancelado:
+            return 0 # El total ya no importa
+
+        total = 0
+        if pos == ultima - 1:
+            # Penultima materia: las parejas validas se cuentan directamente
+            vivas_ultima = permitidas & bits_materia[orden[ultima]]
+            for representante, bits_clase in clases[pos]:
+                tamano = (permitidas & bits_clase).bit_count()
+                if tamano:
+                    total += tamano * (compatibles[representante] & vivas_ultima).bit_count()
+        else:
+            for representante, bits_clase in clases[pos]:
+                tamano = (permitidas & bits_clase).bit_count()
+                if tamano:
+                    total += tamano * contar(pos + 1, permitidas & compatibles[representante])
+        memo[clave] = total
+        return total
+
+    return contar(0, permitidas)
+
+def contar_combinaciones(materias: List[Materia],
+                         indice: Optional[IndiceCompatibilidad] = None,
+                         restricciones: Optional[Restricciones] = None,
+                         estado: Optional[EstadoBusqueda] = None) -> int:
+    """
+    Cuenta los horarios validos sin construirlos.
+    Las materias se separan en grupos independientes (cuyos conteos se
+    multiplican) y dentro de cada grupo se memoriza el conteo por
+    (materia, opciones pendientes aun vivas).
+    Con un tope de horas por dia las materias ya no son independientes ni
+    basta con saber que opciones siguen vivas, asi que se recorre la busqueda
+    (y sus nodos se suman al estado, si se da).
+    Si se da un estado y se cancela, se detiene y devuelve un total incompleto.
+    """
+    if indice is None:
+        indice = obtener_indice_compatibilidad(materias)
+    return _contar(indice, *_preparar_restricciones(materias, indice, restricciones), estado)
+
+def _contar(indice: IndiceCompatibilidad, filtro: int = -1,
+            max_minutos_dia: Optional[int] = None,
+            estado: Optional[EstadoBusqueda] = None) -> int:
+    if max_minutos_dia is not None:
+        return sum(1 for _ in _buscar_indices(indice, estado=estado, filtro=filtro,
+                                              max_minutos_dia=max_minutos_dia))
+
+    permitidas = indice.opciones_viables(filtro)
+    if not all(permitidas & bits for bits in indice.bits_materia):
+        return 0
+
+    total = 1
+    for grupo in indice.grupos_independientes(permitidas):
+        total *= _contar_grupo(indice, grupo, permitidas, estado)
+        if total == 0:
+            break
+    return total
+
+# --- Clases de Equivalencia ---
+# Muchas secciones de una materia tienen exactamente los mismos bloques y
+# solo cambian de profesor o salon. Chocan con las mismas opciones, asi que
+# la busqueda puede hacerse con un representante por clase (un "patron" de
+# horario) y multiplicar despues: el arbol se reduce en el producto de los
+# tamanos de las clases. Cada patron se expande a secciones concretas solo
+# cuando se pide.
+
+class ClasesEquivalencia:
+    """
+    Opciones de cada materia agrupadas por patron de horario (los mismos
+    minutos ocupados). Cada clase se identifica por su representante, la
+    primera de sus opciones (indice global, como en ResultadosCompactos).
+    """
+
+    def __init__(self, indice: IndiceCompatibilidad, permitidas: int = -1):
+        self.miembros: Dict[int, Tuple[int, ...]] = {} # Representante -> opciones de la clase
+        self.representantes = 0 # Bitset, usado como filtro de la busqueda
+        for k, rango in enumerate(indice.rangos):
+            for representante, bits_clase in indice.clases_por_mascara(k, permitidas):
+                self.miembros[representante] = tuple(i for i in rango if bits_clase >> i & 1)
+                self.representantes |= 1 << representante
+
+    def cantidad(self, patron: Tuple[int, ...]) -> int:
+        """Cuantos horarios concretos representa el patron."""
+        total = 1
+        for representante in patron:
+            total *= len(self.miembros[representante])
+        return total
+
+    def expandir(self, patron: Tuple[int, ...]) -> Iterator[Tuple[int, ...]]:
+        """Los horarios concretos del patron, uno a uno (la ultima materia varia primero)."""
+        return itertools.product(*(self.miembros[representante] for representante in patron))
+
+    def concreta(self, patron: Tuple[int, ...], n: int) -> Tuple[int, ...]:
+        """El n-esimo horario concreto del patron, en el orden de expandir, sin recorrer los anteriores."""
+        if not 0 <= n < self.cantidad(patron):
+            raise IndexError("seccion fuera de rango")
+        seleccion = []
+        for representante in reversed(patron):
+            miembros = self.miembros[representante]
+            n, resto = divmod(n, len(miembros))
+            seleccion.append(miembros[resto])
+        return tuple(reversed(seleccion))
+
+def agrupar_equivalentes(materias: List[Materia],
+                         indice: Optional[IndiceCompatibilidad] = None,
+                         restricciones: Optional[Restricciones] = None) -> ClasesEquivalencia:
+    """Clases de equivalencia de las opciones que cumplen las restricciones."""
+    if indice is None:
+        indice = obtener_indice_compatibilidad(materias)
+    return ClasesEquivalencia(indice, opciones_permitidas(materias, indice, restricciones))
+
+def iterar_patrones(materias: List[Materia],
+                    clases: Optional[ClasesEquivalencia] = None,
+                    indice: Optional[IndiceCompatibilidad] = None,
+                    ordenar_por_restriccion: bool = False,
+                    estado: Optional[EstadoBusqueda] = None,
+                    restricciones: Optional[Restricciones] = None) -> Iterator[Tuple[int, ...]]:
+    """
+    Como iterar_selecciones pero con un solo representante por clase: cada
+    resultado es un patron de horario distinto, que clases.expandir convierte
+    en sus horarios concretos. 'clases' debe venir de agrupar_equivalentes
+    con las mismas restricciones.
+    """
+    if indice is None:
+        indice = obtener_indice_compatibilidad(materias)
+    if clases is None:
+        clases = agrupar_equivalentes(materias, indice, restricciones)
+    # Las restricciones por opcion ya quedaron fuera de las clases; el tope
+    # diario depende solo de los minutos, que son los mismos en toda la clase
+    max_minutos_dia = restricciones.max_minutos_dia if restricciones is not None else None
+    return _buscar_indices(indice, ordenar_por_restriccion, estado=estado,
+                           filtro=clases.representantes, max_minutos_dia=max_minutos_dia)
+
+def contar_patrones(materias: List[Materia],
+                    clases: Optional[ClasesEquivalencia] = None,
+                    indice: Optional[IndiceCompatibilidad] = None,
+                    restricciones: Optional[Restricciones] = None,
+                    estado: Optional[EstadoBusqueda] = None) -> int:
+    """Cuantos patrones distintos produce iterar_patrones (ver contar_combinaciones)."""
+    if indice is None:
+        indice = obtener_indice_compatibilidad(materias)
+    if clases is None:
+        clases = agrupar_equivalentes(materias, indice, restricciones)
+    max_minutos_dia = restricciones.max_minutos_dia if restricciones is not None else None
+    return _contar(indice, clases.representantes, max_minutos_dia, estado)
+
+# --- Mejores Horarios (Top-K) ---
+# Cada criterio es un costo (menor = mejor) que se combina en una suma
+# ponderada. La busqueda es el mismo backtracking con forward checking, pero
+# guarda solo los K mejores en un heap acotado y poda las ramas cuya cota
+# inferior ya no puede mejorar al K-esimo.
+
+CRITERIOS = (
+    "huecos",            # Minutos libres entre clases del mismo dia
+    "entrada_temprana",  # 24:00 menos la hora de la clase mas temprana de la semana
+    "dias_con_clase",    # Cuantos dias hay que ir (menos = mas dias libres)
+    "edificios",         # Cuantos edificios distintos se usan
+)
+
+def edificio_de(salon: str) -> str:
+    """Edificio de un salon: sus letras iniciales ('A105', 'A-105' -> 'A')."""
+    salon = (salon or "").strip().upper()
+    letras = ""
+    for caracter in salon:
+        if not caracter.isalpha():
+            break
+        letras += caracter
+    return letras or salon
+
+def _resumen_dia(intervalos: List[Tuple[int, int]]) -> Tuple[int, int, int]:
+    """(primer inicio, ultimo fin, minutos ocupados) de los intervalos de un dia."""
+    ocupado = 0
+    fin_cubierto = 0
+    for inicio, fin in sorted(intervalos):
+        inicio = max(inicio, fin_cubierto) # Sin contar dos veces lo que se encima
+        if fin > inicio:
+            ocupado += fin - inicio
+        fin_cubierto = max(fin_cubierto, fin)
+    return min(i for i, _ in intervalos), max(f for _, f in intervalos), ocupado
+
+def _validar_pesos(pesos: Optional[dict]) -> dict:
+    pesos = dict(pesos) if pesos else {"huecos": 1}
+    for criterio, peso in pesos.items():
+        if criterio not in CRITERIOS:
+            raise ValueError(f"Criterio desconocido: {criterio!r} (use {', '.join(CRITERIOS)})")
+        if peso < 0:
+            raise ValueError(f"El peso de {criterio!r} no puede ser negativo")
+    return pesos
+
+def evaluar_horario(horario: List[Opcion]) -> dict:
+    """Valor de cada criterio (ver CRITERIOS) para un horario completo."""
+    intervalos = {}
+    edificios = set()
+    for opcion in horario:
+        for bloque in opcion.bloques:
+            intervalos.setdefault(bloque.dia, []).append((bloque.hora_inicio, bloque.hora_fin))
+            edificio = edificio_de(bloque.salon or opcion.salon)
+            if edificio:
+                edificios.add(edificio)
+    por_dia = [_resumen_dia(lista) for lista in intervalos.values()]
+    return {
+        "huecos": sum(ultimo - primero - ocupado for primero, ultimo, ocupado in por_dia),
+        "entrada_temprana": MINUTOS_POR_DIA - min(p for p, _, _ in por_dia) if por_dia else 0,
+        "dias_con_clase": len(por_dia),
+        "edificios": len(edificios),
+    }
+
+def costo_horario(horario: List[Opcion], pesos: Optional[dict] = None) -> float:
+    """Suma ponderada de los criterios; menor es mejor."""
+    valores = evaluar_horario(horario)
+    return sum(peso * valores[criterio] for criterio, peso in _validar_pesos(pesos).items())
+
+def _perfiles_opciones(materias: List[Materia]) -> list:
+    """
+    Por opcion (indice global): ((dia, primer inicio, ultimo fin, minutos), ...),
+    bitset de edificios y minutos totales de clase.
+    """
+    numeros_edificio = {}
+    perfiles = []
+    for materia in materias:
+        for opcion in materia.opciones:
+            intervalos = {}
+            bits_edificios = 0
+            for bloque in opcion.bloques:
+                intervalos.setdefault(bloque.dia, []).append((bloque.hora_inicio, bloque.hora_fin))
+                edificio = edificio_de(bloque.salon or opcion.salon)
+                if edificio:
+                    bits_edificios |= 1 << numeros_edificio.setdefault(edificio, len(numeros_edificio))
+            dias = tuple((dia,) + _resumen_dia(lista) for dia, lista in intervalos.items())
+            perfiles.append((dias, bits_edificios, sum(d[3] for d in dias)))
+    return perfiles
+
+def _mejores_indices(indice: IndiceCompatibilidad, perfiles: list, k: int, pesos: dict,
+                     estado: Optional[EstadoBusqueda] = None, filtro: int = -1,
+                     max_minutos_dia: Optional[int] = None) -> List[Tuple[float, Tuple[int, ...]]]:
+    """
+    Branch and bound sobre el indice. La cota de cada nodo es admisible
+    (nunca supera el costo de un horario que complete la rama):
+      * huecos: max(0, huecos actuales - minutos que aun pueden agregarse),
+        porque una clase nueva solo rellena huecos con sus propios minutos;
+      * entrada temprana, dias con clase y edificios solo pueden crecer, asi
+        que su valor actual ya es cota; ademas se suma lo que toda opcion de
+        las materias pendientes agrega sin remedio (los dias y edificios que
+        comparten todas, la entrada mas tardia posible).
+    Los empates se resuelven por orden de aparicion, asi que el resultado es
+    el mismo que ordenar (de forma estable) todos los horarios y tomar K.
+    """
+    rangos = indice.rangos
+    compatibles = indice.compatibles
+    bits_materia = indice.bits_materia
+    n = len(rangos)
+    w_huecos = pesos.get("huecos", 0)
+    w_entrada = pesos.get("entrada_temprana", 0)
+    w_dias = pesos.get("dias_con_clase", 0)
+    w_edificios = pesos.get("edificios", 0)
+
+    # Minutos que como maximo pueden agregar las materias desde la posicion p
+    # y lo que cualquier eleccion de esas materias agrega de todos modos
+    restante = [0] * (n + 1)
+    dias_seguros = [0] * (n + 1)
+    edificios_seguros = [0] * (n + 1)
+    entrada_segura = [0] * (n + 1)
+    for pos in range(n - 1, -1, -1):
+        opciones = [perfiles[i] for i in rangos[pos]]
+        restante[pos] = restante[pos + 1] + max((p[2] for p in opciones), default=0)
+        dias_comunes = edificios_comunes = -1
+        entrada = MINUTOS_POR_DIA
+        for dias_opcion, bits_edificios, _ in opciones:
+            mascara = 0
+            for dia, _, _, _ in dias_opcion:
+                mascara |= 1 << dia
+            dias_comunes &= mascara
+            edificios_comunes &= bits_edificios
+            entrada = min(entrada, MINUTOS_POR_DIA - min((d[1] for d in dias_opcion), default=MINUTOS_POR_DIA))
+        dias_seguros[pos] = dias_seguros[pos + 1] | max(dias_comunes, 0)
+        edificios_seguros[pos] = edificios_seguros[pos + 1] | max(edificios_comunes, 0)
+        entrada_segura[pos] = max(entrada_segura[pos + 1], entrada)
+
+    primero = [0] * 7
+    ultimo = [0] * 7
+    ocupado = [0] * 7
+    horario_actual = [0] * n
+    mejores = [] # Heap de (-costo, -orden, seleccion): la raiz es el peor guardado
+    encontrados = 0
+    tope = _TopeDiario(indice, max_minutos_dia) if max_minutos_dia is not None else None
+
+    def backtrack(pos, permitidas, huecos, entrada, dias, edificios):
+        nonlocal encontrados
+        if estado is not None:
+            if estado.cancelado:
+                return
+            estado.nodos += 1
+
+        cota = (w_huecos * max(0, huecos - restante[pos])
+                + w_entrada * max(entrada, entrada_segura[pos])
+                + w_dias * (dias | dias_seguros[pos]).bit_count()
+                + w_edificios * (edificios | edificios_seguros[pos]).bit_count())
+        if len(mejores) == k and cota >= -mejores[0][0]:
+            if estado is not None:
+                estado.podas += 1
+            return # Poda: esta rama no puede superar al K-esimo
+
+        if pos == n:
+            if estado is not None:
+                estado.soluciones += 1
+            elemento = (-cota, -encontrados, tuple(horario_actual))
+            encontrados += 1
+            if len(mejores) < k:
+                heapq.heappush(mejores, elemento)
+            else:
+                heapq.heapreplace(mejores, elemento)
+            return
+
+        resto = range(pos + 1, n)
+        for i in rangos[pos]:
+            if not permitidas >> i & 1:
+                continue
+            nuevas = permitidas & compatibles[i]
+            if tope is not None:
+                nuevas = tope.agregar(i, nuevas)
+            if not all(nuevas & bits_materia[m] for m in resto):
+                if estado is not None:
+                    estado.podas += 1
+                if tope is not None:
+                    tope.quitar(i)
+                continue
+
+            dias_opcion, bits_edificios, _ = perfiles[i]
+            anteriores = []
+            nuevos_huecos = huecos
+            nueva_entrada = entrada
+            nuevos_dias = dias
+            for dia, inicio, fin, minutos in dias_opcion:
+                anteriores.append((dia, primero[dia], ultimo[dia], ocupado[dia]))
+                if dias >> dia & 1:
+                    nuevos_huecos -= ultimo[dia] - primero[dia] - ocupado[dia]
+                    primero[dia] = min(primero[dia], inicio)
+                    ultimo[dia] = max(ultimo[dia], fin)
+                    ocupado[dia] += minutos
+                else:
+                    primero[dia], ultimo[dia], ocupado[dia] = inicio, fin, minutos
+                nuevos_huecos += ultimo[dia] - primero[dia] - ocupado[dia]
+                nueva_entrada = max(nueva_entrada, MINUTOS_POR_DIA - inicio)
+                nuevos_dias |= 1 << dia
+
+            horario_actual[pos] = i
+            backtrack(pos + 1, nuevas, nuevos_huecos, nueva_entrada,
+                      nuevos_dias, edificios | bits_edificios)
+
+            for dia, p, u, o in anteriores:
+                primero[dia], ultimo[dia], ocupado[dia] = p, u, o
+            if tope is not None:
+                tope.quitar(i)
+
+    if k > 0:
+        permitidas = indice.opciones_viables(filtro)
+        if all(permitidas & bits for bits in bits_materia):
+            backtrack(0, permitidas, 0, 0, 0, 0)
+
+    mejores.sort(key=lambda e: (-e[0], -e[1]))
+    return [(-costo, seleccion) for costo, _, seleccion in mejores]
+
+def mejores_selecciones(materias: List[Materia], k: int = 20, pesos: Optional[dict] = None,
+                        indice: Optional[IndiceCompatibilidad] = None,
+                        estado: Optional[EstadoBusqueda] = None,
+                        restricciones: Optional[Restricciones] = None) -> List[Tuple[float, Tuple[int, ...]]]:
+    """
+    Los K horarios de menor costo como pares (costo, tupla de indices
+    globales de opcion; ver ResultadosCompactos), del mejor al peor.
+    'pesos' asigna un peso a cada criterio de CRITERIOS, por ejemplo
+    {"huecos": 1, "dias_con_clase": 60}; por defecto solo cuentan los huecos.
+    La memoria es O(K): nunca se guardan todos los horarios.
+    """
+    pesos = _validar_pesos(pesos)
+    if indice is None:
+        indice = obtener_indice_compatibilidad(materias)
+    filtro, max_minutos_dia = _preparar_restricciones(materias, indice, restricciones)
+    return _mejores_indices(indice, _perfiles_opciones(materias), k, pesos, estado,
+                            filtro, max_minutos_dia)
+
+def mejores_horarios(materias: List[Materia], k: int = 20, pesos: Optional[dict] = None,
+                     indice: Optional[IndiceCompatibilidad] = None,
+                     restricciones: Optional[Restricciones] = None,
+                     estado: Optional[EstadoBusqueda] = None) -> List[Tuple[float, List[Opcion]]]:
+    """Igual que mejores_selecciones pero con las listas de Opcion de cada horario."""
+    opciones = [opcion for materia in materias for opcion in materia.opciones]
+    return [
+        (costo, [opciones[i] for i in seleccion])
+        for costo, seleccion in mejores_selecciones(materias, k, pesos, indice, estado=estado,
+                                                    restricciones=restricciones)
+    ]
+
 # --- Bloque de Prueba (Solo se ejecuta si corres este archivo) ---
 if __name__ == "__main__":
     print("--- Probando Motor de Logica ---")
     
     # Creamos datos falsos para probar
     # Materia 1: Matematicas (Lunes 8-10)
-    b1 = Bloque("Lunes", convertir_hora_a_minutos("08:00"), convertir_hora_a_minutos("10:00"), "A1")
-    op1 = Opcion(1, "Prof. A", "101", [b1])
+    b1 = Bloque(Dia.LUN, convertir_hora_a_minutos("08:00"), convertir_hora_a_minutos("10:00"), "A1")
+    op1 = Opcion(1, "Matematicas", "Prof. A", "101", [b1])
     mat1 = Materia(1, "Matematicas", [op1])
 
     # Materia 2: Fisica (Lunes 9-11) -> Deberia chocar con Matematicas
-    b2 = Bloque("Lunes", convertir_hora_a_minutos("09:00"), convertir_hora_a_minutos("11:00"), "B1")
-    op2 = Opcion(2, "Prof. B (Choque)", "102", [b2])
+    b2 = Bloque(Dia.LUN, convertir_hora_a_minutos("09:00"), convertir_hora_a_minutos("11:00"), "B1")
+    op2 = Opcion(2, "Fisica", "Prof. B (Choque)", "102", [b2])
     
     # Materia 2: Fisica (Lunes 10-12) -> No deberia chocar
-    b3 = Bloque("Lunes", convertir_hora_a_minutos("10:00"), convertir_hora_a_minutos("12:00"), "B2")
-    op3 = Opcion(3, "Prof. C (Valido)", "103", [b3])
+    b3 = Bloque(Dia.LUN, convertir_hora_a_minutos("10:00"), convertir_hora_a_minutos("12:00"), "B2")
+    op3 = Opcion(3, "Fisica", "Prof. C (Valido)", "103", [b3])
     
     mat2 = Materia(2, "Fisica", [op2, op3])
 
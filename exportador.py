@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Exportacion del catalogo y de los horarios generados a CSV, JSON Lines e
+iCalendar.
+
+Todo se produce con generadores y se escribe linea por linea: exportar un
+millon de horarios (por ejemplo directo de engine.iterar_combinaciones o de
+un ResultadosCompactos) usa memoria constante.
+
+El CSV y el JSONL del catalogo tienen el formato que lee importador.py.
+
+Uso sin interfaz:
+  python exportador.py catalogo salida.csv|salida.jsonl [--db horario.db]
+  python exportador.py horarios salida.csv|salida.jsonl|salida.ics [--limite N]
+                       [--inicio AAAA-MM-DD] [--semanas 16] [--db horario.db]
+"""
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+import catalogo
+import database
+import engine
+from engine import DIAS, minutos_a_hora
+
+SEMANAS_POR_DEFECTO = 16
+ENCABEZADO_CATALOGO = ('materia', 'profesor', 'seccion', 'dia', 'inicio', 'fin', 'salon')
+ENCABEZADO_HORARIOS = ('horario', 'materia', 'profesor', 'dia', 'inicio', 'fin', 'salon')
+
+# --- Catalogo ---
+
+def filas_catalogo():
+    """Una fila por bloque (ver ENCABEZADO_CATALOGO), leida del cursor sin fetchall."""
+    cursor = database.obtener_conexion().execute("""
+        SELECT m.nombre, o.profesor, o.id, b.dia_num, b.dia, b.hora_inicio, b.hora_fin,
+               COALESCE(NULLIF(b.salon, ''), o.salon, '')
+        FROM materias m
+        JOIN opciones o ON o.materia_id = m.id
+        JOIN bloques b ON b.opcion_id = o.id
+        ORDER BY LOWER(m.nombre), o.id, b.id
+    """)
+    try:
+        for nombre, profesor, id_opcion, dia_num, dia, inicio, fin, salon in cursor:
+            dia = DIAS[dia_num] if dia_num is not None else dia
+            yield nombre, profesor or '', id_opcion, dia, inicio, fin, salon
+    finally:
+        cursor.close()
+
+def materias_catalogo():
+    """
+    Una materia por elemento, con la forma de insertar_materia_completa.
+    Las materias con el mismo nombre salen juntas (igual que en la lista).
+    """
+    for _, filas in itertools.groupby(filas_catalogo(), key=lambda f: catalogo.clave_materia(f[0])):
+        materia = None
+        for nombre, profesor, id_opcion, dia, inicio, fin, salon in filas:
+            if materia is None:
+                materia = {"nombre": nombre, "opciones": []}
+            opciones = materia["opciones"]
+            if not opciones or opciones[-1]["id"] != id_opcion:
+                opciones.append({"id": id_opcion, "profesor": profesor, "bloques": []})
+            opciones[-1]["bloques"].append(
+                {"dia": dia, "inicio": inicio, "fin": fin, "salon": salon}
+            )
+        yield materia
+
+# --- Horarios generados ---
+
+def filas_horarios(horarios):
+    """Una fila por bloque de cada horario (ver ENCABEZADO_HORARIOS)."""
+    for numero, horario in enumerate(horarios, 1):
+        for opcion in horario:
+            for bloque in opcion.bloques:
+                yield (
+                    numero, opcion.nombre_materia, opcion.profesor, DIAS[bloque.dia],
+                    minutos_a_hora(bloque.hora_inicio), minutos_a_hora(bloque.hora_fin),
+                    bloque.salon or opcion.salon or ''
+                )
+
+def registros_horarios(horarios):
+    """Un dict por horario, con sus materias y bloques."""
+    for numero, horario in enumerate(horarios, 1):
+        yield {
+            "horario": numero,
+            "materias": [
+                {
+                    "materia": opcion.nombre_materia,
+                    "profesor": opcion.profesor,
+                    "bloques": [
+                        {
+                            "dia": DIAS[bloque.dia],
+                            "inicio": minutos_a_hora(bloque.hora_inicio),
+                            "fin": minutos_a_hora(bloque.hora_fin),
+                            "salon": bloque.salon or opcion.salon or ''
+                        }
+                        for bloque in opcion.bloques
+                    ]
+                }
+                for opcion in horario
+            ]
+        }
+
+# --- Formatos ---
+
+def lineas_csv(encabezado, filas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator='\n')
+    for fila in itertools.chain([encabezado], filas):
+        escritor.writerow(fila)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+def lineas_jsonl(registros):
+    for registro in registros:
+        yield json.dumps(registro, ensure_ascii=False) + '\n'
+
+def _texto_ical(texto):
+    return (str(texto).replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+def _plegar_ical(linea):
+    """Las lineas de iCalendar no deben pasar de 75 octetos (RFC 5545, 3.1)."""
+    partes, actual, limite = [], '', 75
+    for caracter in linea:
+        if len((actual + caracter).encode('utf-8')) > limite:
+            partes.append(actual)
+            actual, limite = ' ', 75
+        actual += caracter
+    partes.append(actual)
+    return '\r\n'.join(partes) + '\r\n'
+
+def lineas_ical(horarios, fecha_inicio=None, semanas=SEMANAS_POR_DEFECTO):
+    """
+    Calendario con un evento semanal (RRULE) por bloque. Cada clase empieza
+    el primer dia que le toca a partir de fecha_inicio (hoy por defecto) y
+    se repite 'semanas' veces. Las horas son locales (sin zona horaria).
+    """
+    fecha_inicio = fecha_inicio or date.today()
+    sello = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+    yield from map(_plegar_ical, (
+        "BEGIN:VCALENDAR", "VERSION:2.0",
+        "PRODID:-//HorarioClasesApp//Exportador//ES", "CALSCALE:GREGORIAN"
+    ))
+    for numero, horario in enumerate(horarios, 1):
+        for opcion in horario:
+            for posicion, bloque in enumerate(opcion.bloques):
+                # date.weekday() usa la misma numeracion que engine.Dia (Lun = 0)
+                dia = fecha_inicio + timedelta(days=(bloque.dia - fecha_inicio.weekday()) % 7)
+                inicio = minutos_a_hora(bloque.hora_inicio).replace(':', '')
+                fin = minutos_a_hora(bloque.hora_fin).replace(':', '')
+                yield from map(_plegar_ical, (
+                    "BEGIN:VEVENT",
+                    f"UID:{numero}-{opcion.id_opcion}-{posicion}@horarioclasesapp",
+                    f"DTSTAMP:{sello}",
+                    f"DTSTART:{dia:%Y%m%d}T{inicio}00",
+                    f"DTEND:{dia:%Y%m%d}T{fin}00",
+                    f"RRULE:FREQ=WEEKLY;COUNT={semanas}",
+                    f"SUMMARY:{_texto_ical(opcion.nombre_materia)}",
+                    f"LOCATION:{_texto_ical(bloque.salon or opcion.salon or '')}",
+                    f"DESCRIPTION:{_texto_ical(f'Profesor: {opcion.profesor} (Horario {numero})')}",
+                    "END:VEVENT"
+                ))
+    yield _plegar_ical("END:VCALENDAR")
+
+# --- Escritura ---
+
+def escribir_lineas(ruta, lineas):
+    """Escribe las lineas una a una. Devuelve cuantas se escribieron."""
+    total = 0
+    with open(ruta, 'w', encoding='utf-8', newline='') as archivo:
+        for linea in lineas:
+            archivo.write(linea)
+            total += 1
+    return total
+
+def _extension(ruta, permitidas):
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension not in permitidas:
+        raise ValueError(f"Formato no soportado: '{extension}' (use {', '.join(permitidas)})")
+    return extension
+
+def exportar_catalogo(ruta):
+    """Exporta todo el catalogo a .csv o .jsonl segun la extension."""
+    if _extension(ruta, ('.csv', '.jsonl')) == '.csv':
+        return escribir_lineas(ruta, lineas_csv(ENCABEZADO_CATALOGO, filas_catalogo()))
+    return escribir_lineas(ruta, lineas_jsonl(materias_catalogo()))
+
+def lineas_horarios(formato, horarios, fecha_inicio=None, semanas=SEMANAS_POR_DEFECTO):
+    """Lineas de texto de los horarios en 'csv', 'jsonl' o 'ics'."""
+    if formato == 'csv':
+        return lineas_csv(ENCABEZADO_HORARIOS, filas_horarios(horarios))
+    if formato == 'jsonl':
+        return lineas_jsonl(registros_horarios(horarios))
+    if formato == 'ics':
+        return lineas_ical(horarios, fecha_inicio, semanas)
+    raise ValueError(f"Formato no soportado: '{formato}' (use csv, jsonl o ics)")
+
+def exportar_horarios(ruta, horarios, fecha_inicio=None, semanas=SEMANAS_POR_DEFECTO):
+    """
+    Exporta horarios (cualquier iterable de listas de Opcion) a .csv, .jsonl
+    o .ics segun la extension.
+    """
+    formato = _extension(ruta, ('.csv', '.jsonl', '.ics'))[1:]
+    return escribir_lineas(ruta, lineas_horarios(formato, horarios, fecha_inicio, semanas))
+
+# --- Uso sin interfaz ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta el catalogo o los horarios generados.")
+    parser.add_argument('que', choices=('catalogo', 'horarios'))
+    parser.add_argument('salida', help="Archivo .csv, .jsonl o .ics (solo horarios)")
+    parser.add_argument('--db', help="Base de datos (por defecto $HORARIO_DB o horario.db)")
+    parser.add_argument('--limite', type=int, help="Maximo de horarios a exportar")
+    parser.add_argument('--inicio', type=date.fromisoformat, help="Primer dia del calendario (iCal)")
+    parser.add_argument('--semanas', type=int, default=SEMANAS_POR_DEFECTO)
+    args = parser.parse_args(argv)
+
+    if args.db:
+        database.configurar_ruta(args.db)
+    # Igual que en horario.py: los avisos de database van a stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        database.inicializar_db()
+
+    try:
+        if args.que == 'catalogo':
+            lineas = exportar_catalogo(args.salida)
+        else:
+            # estricto: si la lectura falla no se exporta un archivo vacio
+            horarios = engine.iterar_combinaciones(catalogo.materias_para_motor(estricto=True))
+            lineas = exportar_horarios(
+                args.salida, itertools.islice(horarios, args.limite), args.inicio, args.semanas
+            )
+    except (OSError, ValueError, database.Error) as e:
+        print(f"Error al exportar: {e}")
+        return 1
+
+    print(f"Se escribieron {lineas} lineas en {args.salida}.")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Linea de comandos sin interfaz grafica (para servidores y tareas cron).
+
+  python -m horario generate --db horario.db --out horarios.jsonl
+                             [--materias "Calculo" "Fisica"] [--limite N]
+                             [--formato csv|jsonl|ics] [--procesos N]
+                             [--mejores K [--criterio huecos=1 dias_con_clase=60]]
+  python -m horario count --db horario.db [--materias ...] [--patrones]
+
+Ambos aceptan restricciones: --dia-libre Vie, --bloquear "Lun 07:00-09:00",
+--profesor "Calculo=Perez", --vetar "Lopez", --max-horas-dia 6.
+Con --diagnostico al terminar se escribe en stderr un resumen de tiempos y
+contadores (nodos, podas, sentencias SQL...); --perfil CARPETA ademas vuelca
+un perfil de cProfile (ver instrumentacion.py).
+
+Con --out - los horarios salen por la salida estandar; los mensajes siempre
+van a stderr. Este modulo NO importa Qt (ni nada de ui/): solo catalogo,
+database, engine y exportador, asi arranca en milisegundos.
+"""
+import argparse
+import contextlib
+import itertools
+import logging
+import os
+import sys
+import time
+
+import catalogo
+import database
+import engine
+import exportador
+import instrumentacion
+
+def cargar_materias(nombres=None):
+    """
+    Lee el catalogo para el motor. Con 'nombres' se queda solo con esas
+    materias (sin distinguir mayusculas) y falla si alguna no existe.
+    """
+    # database informa con print; aqui stdout puede ser la salida de datos
+    with contextlib.redirect_stdout(sys.stderr):
+        database.inicializar_db()
+        materias = catalogo.materias_para_motor()
+
+    if not nombres:
+        return materias
+    por_nombre = {materia.nombre.lower(): materia for materia in materias}
+    faltantes = [nombre for nombre in nombres if nombre.lower() not in por_nombre]
+    if faltantes:
+        raise ValueError(f"Materias no encontradas: {', '.join(faltantes)}")
+    return [por_nombre[nombre.lower()] for nombre in nombres]
+
+def _ventana(texto):
+    """'Lun 07:00-09:00' -> (Dia.LUN, 420, 540)"""
+    try:
+        dia, horas = texto.split(None, 1)
+        inicio, fin = (engine.convertir_hora_a_minutos(h.strip()) for h in horas.split('-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"use 'Dia HH:MM-HH:MM', no {texto!r}") from None
+    return engine.Dia.desde_texto(dia), inicio, fin
+
+def _profesor_requerido(texto):
+    materia, signo, profesor = texto.partition('=')
+    if not signo or not materia.strip() or not profesor.strip():
+        raise argparse.ArgumentTypeError(f"use 'Materia=Profesor', no {texto!r}")
+    return materia.strip(), profesor.strip()
+
+def restricciones(args):
+    """engine.Restricciones a partir de las opciones de linea de comandos."""
+    return engine.Restricciones(
+        ventanas_bloqueadas=args.bloquear or [],
+        dias_libres=args.dia_libre or [],
+        profesores_requeridos=dict(args.profesor or []),
+        profesores_prohibidos=args.vetar or [],
+        max_minutos_dia=round(args.max_horas_dia * 60) if args.max_horas_dia else None
+    )
+
+def _formato(args):
+    if args.formato:
+        return args.formato
+    extension = os.path.splitext(args.out)[1].lower().lstrip('.')
+    return extension if extension in ('csv', 'jsonl', 'ics') else 'jsonl'
+
+def _pesos(criterios):
+    """['huecos', 'dias_con_clase=60'] -> {'huecos': 1.0, 'dias_con_clase': 60.0}"""
+    pesos = {}
+    for texto in criterios or ():
+        nombre, _, peso = texto.partition('=')
+        try:
+            pesos[nombre.strip()] = float(peso) if peso else 1.0
+        except ValueError:
+            raise ValueError(f"Peso invalido en --criterio {texto!r}") from None
+    return pesos or None
+
+def comando_generate(args):
+    materias = cargar_materias(args.materias)
+    filtro = restricciones(args)
+    # Los contadores del motor solo se llevan si alguien los va a leer
+    estado = engine.EstadoBusqueda() if instrumentacion.activa() else None
+    if args.mejores is not None:
+        # Ya vienen ordenados del mejor al peor; --limite no hace falta
+        horarios = (h for _, h in engine.mejores_horarios(materias, args.mejores, _pesos(args.criterio),
+                                                          restricciones=filtro, estado=estado))
+    elif args.procesos:
+        # Cada proceso lleva su propia busqueda: aqui no hay contadores
+        horarios = engine.iterar_combinaciones_paralelo(materias, procesos=args.procesos,
+                                                        restricciones=filtro)
+    else:
+        horarios = engine.iterar_combinaciones(materias, estado=estado, restricciones=filtro)
+
+    contados = [0]
+    def contar(iterable):
+        for horario in iterable:
+            contados[0] += 1
+            yield horario
+
+    inicio = time.perf_counter()
+    lineas = exportador.lineas_horarios(
+        _formato(args), contar(itertools.islice(horarios, args.limite))
+    )
+    if args.out == '-':
+        for linea in lineas:
+            sys.stdout.write(linea)
+        sys.stdout.flush()
+    else:
+        exportador.escribir_lineas(args.out, lineas)
+
+    segundos = time.perf_counter() - inicio
+    if estado is not None:
+        instrumentacion.sumar_estado(estado)
+    print(f"{contados[0]} horarios de {len(materias)} materias en {segundos:.2f} s.", file=sys.stderr)
+    return 0
+
+def comando_count(args):
+    materias = cargar_materias(args.materias)
+    if args.patrones:
+        print(engine.contar_patrones(materias, restricciones=restricciones(args)))
+    else:
+        print(engine.contar_combinaciones(materias, restricciones=restricciones(args)))
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m horario',
+                                     description="Generador de horarios sin interfaz grafica.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    comun = argparse.ArgumentParser(add_help=False)
+    comun.add_argument('--db', help="Base de datos (por defecto $HORARIO_DB o horario.db)")
+    comun.add_argument('--materias', nargs='+', metavar='NOMBRE',
+                       help="Solo estas materias (por defecto todo el catalogo)")
+    comun.add_argument('--dia-libre', nargs='+', type=engine.Dia.desde_texto, metavar='DIA',
+                       help="Dias sin ninguna clase")
+    comun.add_argument('--bloquear', nargs='+', type=_ventana, metavar='"DIA HH:MM-HH:MM"',
+                       help="Horas en las que no puede haber clase")
+    comun.add_argument('--profesor', nargs='+', type=_profesor_requerido, metavar='MATERIA=PROFESOR',
+                       help="Tomar la materia solo con ese profesor")
+    comun.add_argument('--vetar', nargs='+', metavar='PROFESOR', help="Profesores a evitar")
+    comun.add_argument('--max-horas-dia', type=float, metavar='HORAS',
+                       help="Tope de horas de clase en un mismo dia")
+    comun.add_argument('--diagnostico', action='store_true',
+                       help="Resumen de tiempos y contadores en stderr al terminar")
+    comun.add_argument('--perfil', metavar='CARPETA',
+                       help="Guardar un perfil de cProfile en CARPETA (implica --diagnostico)")
+
+    generar = subparsers.add_parser('generate', parents=[comun], help="Genera y escribe los horarios")
+    generar.add_argument('--out', default='-', help="Archivo de salida, o - para stdout")
+    generar.add_argument('--formato', choices=('csv', 'jsonl', 'ics'),
+                         help="Por defecto segun la extension de --out (jsonl para stdout)")
+    generar.add_argument('--limite', type=int, help="Maximo de horarios a escribir")
+    generar.add_argument('--procesos', type=int, help="Repartir la busqueda entre N procesos")
+    generar.add_argument('--mejores', type=int, metavar='K',
+                         help="Solo los K mejores horarios segun --criterio")
+    generar.add_argument('--criterio', nargs='+', metavar='NOMBRE[=PESO]',
+                         help=f"Criterios de --mejores ({', '.join(engine.CRITERIOS)}); por defecto huecos")
+    generar.set_defaults(funcion=comando_generate)
+
+    contar = subparsers.add_parser('count', parents=[comun], help="Solo cuenta los horarios validos")
+    contar.add_argument('--patrones', action='store_true',
+                        help="Contar horarios distintos (agrupando secciones con el mismo horario)")
+    contar.set_defaults(funcion=comando_count)
+
+    args = parser.parse_args(argv)
+    if args.db:
+        database.configurar_ruta(args.db)
+    if args.diagnostico or args.perfil:
+        logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(name)s: %(message)s")
+        instrumentacion.activar(args.perfil)
+
+    try:
+        with instrumentacion.operacion(args.comando):
+            return args.funcion(args)
+    except BrokenPipeError:
+        # Quien leia stdout (p. ej. head) ya no quiere mas datos; no es un error.
+        # Se redirige stdout para que Python no falle al vaciarlo al salir.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (OSError, ValueError, database.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
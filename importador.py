@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Importacion masiva del catalogo (la oferta completa de la universidad).
+
+Formatos aceptados:
+  * CSV  - una fila por bloque, con encabezado:
+           materia, profesor, [seccion], dia, inicio, fin, [salon]
+           Las filas con la misma materia y la misma seccion (o el mismo
+           profesor si no hay columna seccion) forman una opcion.
+  * JSONL - una materia por linea, con la misma forma que recibe
+           database.insertar_materia_completa:
+           {"nombre": ..., "opciones": [{"profesor": ..., "bloques": [...]}]}
+  * JSON  - una lista de materias con esa misma forma.
+
+Los CSV y JSONL se leen en streaming (fila por fila); un JSON se carga
+entero con json.load, asi que para ofertas muy grandes conviene JSONL. Todo
+se inserta por lotes con executemany dentro de UNA transaccion: si una fila
+es invalida no se guarda nada. Los ids de
+opciones y materias se asignan por adelantado para no tener que leer
+lastrowid fila por fila.
+
+Uso: python importador.py oferta.csv [--db horario.db] [--lote 5000]
+"""
+import argparse
+import csv
+import json
+import os
+import time
+
+import catalogo
+import database
+from engine import Dia, convertir_hora_a_minutos, minutos_a_hora
+
+TAMANO_LOTE = 5000
+
+# --- Lectura de archivos ---
+# Los lectores producen tuplas (linea, materia, clave_opcion, profesor, bloque)
+# con un bloque por tupla; clave_opcion agrupa los bloques de una opcion.
+
+def _leer_csv(archivo):
+    lector = csv.DictReader(archivo)
+    if lector.fieldnames is None:
+        return
+    lector.fieldnames = [c.strip().lower() for c in lector.fieldnames]
+    faltantes = {'materia', 'profesor', 'dia', 'inicio', 'fin'} - set(lector.fieldnames)
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el CSV: {', '.join(sorted(faltantes))}")
+
+    for fila in lector:
+        materia = (fila['materia'] or '').strip()
+        profesor = (fila['profesor'] or '').strip()
+        seccion = (fila.get('seccion') or '').strip()
+        bloque = {
+            'dia': fila['dia'],
+            'inicio': fila['inicio'],
+            'fin': fila['fin'],
+            'salon': (fila.get('salon') or '').strip()
+        }
+        yield lector.line_num, materia, seccion or profesor, profesor, bloque
+
+def _materias_a_bloques(linea, datos):
+    """Aplana una materia con forma de insertar_materia_completa."""
+    materia = (datos.get('nombre') or '').strip()
+    opciones = datos.get('opciones') or [datos]
+    for num_opcion, opcion in enumerate(opciones):
+        profesor = (opcion.get('profesor') or '').strip()
+        for bloque in opcion.get('bloques', []):
+            yield linea, materia, (linea, num_opcion), profesor, bloque
+
+def _leer_jsonl(archivo):
+    for linea, texto in enumerate(archivo, 1):
+        if not texto.strip():
+            continue
+        try:
+            datos = json.loads(texto)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Linea {linea}: JSON invalido ({e})") from None
+        yield from _materias_a_bloques(linea, datos)
+
+def _leer_json(archivo):
+    # Sin streaming: json.load necesita el documento completo en memoria
+    for num, datos in enumerate(json.load(archivo), 1):
+        yield from _materias_a_bloques(num, datos)
+
+LECTORES = {'.csv': _leer_csv, '.jsonl': _leer_jsonl, '.json': _leer_json}
+
+# --- Carga ---
+
+def _normalizar_bloque(linea, bloque):
+    """Valida el bloque y lo deja como lo guarda la aplicacion."""
+    try:
+        dia = Dia.desde_texto(bloque['dia'])
+        inicio = convertir_hora_a_minutos(bloque['inicio'].strip())
+        fin = convertir_hora_a_minutos(bloque['fin'].strip())
+    except (KeyError, ValueError, AttributeError) as e:
+        raise ValueError(f"Linea {linea}: bloque invalido {bloque!r} ({e})") from None
+    if fin <= inicio:
+        raise ValueError(f"Linea {linea}: la hora de fin debe ser posterior al inicio")
+    return dia, minutos_a_hora(inicio), minutos_a_hora(fin), (bloque.get('salon') or '').strip()
+
+def _siguiente_id(cursor, tabla):
+    """Primer id libre de una tabla AUTOINCREMENT (tambien respeta ids borrados)."""
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabla}")
+    maximo = cursor.fetchone()[0]
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (tabla,))
+    fila = cursor.fetchone()
+    return max(maximo, fila[0] if fila else 0) + 1
+
+def importar_filas(filas, tamano_lote=TAMANO_LOTE):
+    """
+    Inserta un flujo de bloques (ver los lectores de arriba) en una sola
+    transaccion. Las materias que ya existen (mismo nombre, sin distinguir
+    mayusculas) reciben las opciones nuevas en vez de duplicarse.
+    Devuelve un dict con los conteos y el tiempo empleado.
+    """
+    inicio_reloj = time.perf_counter()
+    conteo = {'materias': 0, 'opciones': 0, 'bloques': 0}
+
+    with database.transaccion() as cursor:
+        # Tomar el bloqueo de escritura antes de leer los ids: con WAL otra
+        # conexion podria insertar entre la lectura y nuestros INSERT
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT LOWER(nombre), MIN(id) FROM materias GROUP BY LOWER(nombre)")
+        ids_materias = dict(cursor.fetchall())
+        ids_opciones = {}
+        siguiente_materia = _siguiente_id(cursor, 'materias')
+        siguiente_opcion = _siguiente_id(cursor, 'opciones')
+
+        lote_materias, lote_opciones, lote_bloques = [], [], []
+
+        def vaciar_lotes():
+            cursor.executemany("INSERT INTO materias (id, nombre) VALUES (?, ?)", lote_materias)
+            cursor.executemany(
+                "INSERT INTO opciones (id, materia_id, profesor, salon) VALUES (?, ?, ?, ?)",
+                lote_opciones
+            )
+            cursor.executemany(
+                "INSERT INTO bloques (opcion_id, dia, dia_num, hora_inicio, hora_fin, salon) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                lote_bloques
+            )
+            lote_materias.clear()
+            lote_opciones.clear()
+            lote_bloques.clear()
+
+        for linea, materia, clave_opcion, profesor, bloque in filas:
+            if not materia:
+                raise ValueError(f"Linea {linea}: falta el nombre de la materia")
+            dia, inicio, fin, salon = _normalizar_bloque(linea, bloque)
+
+            # Igual que LOWER() de SQLite (solo ASCII), o 'ÁLGEBRA' no
+            # encontraria la materia que ya existe
+            clave_materia = catalogo.clave_materia(materia)
+            id_materia = ids_materias.get(clave_materia)
+            if id_materia is None:
+                id_materia = ids_materias[clave_materia] = siguiente_materia
+                siguiente_materia += 1
+                lote_materias.append((id_materia, materia))
+                conteo['materias'] += 1
+
+            id_opcion = ids_opciones.get((clave_materia, clave_opcion))
+            if id_opcion is None:
+                id_opcion = ids_opciones[(clave_materia, clave_opcion)] = siguiente_opcion
+                siguiente_opcion += 1
+                # Igual que en la captura manual: el salon de la opcion es el
+                # del primer bloque.
+                lote_opciones.append((id_opcion, id_materia, profesor, salon))
+                conteo['opciones'] += 1
+
+            lote_bloques.append((id_opcion, dia.abreviatura, int(dia), inicio, fin, salon))
+            conteo['bloques'] += 1
+            if len(lote_bloques) >= tamano_lote:
+                vaciar_lotes()
+
+        vaciar_lotes()
+
+    database.marcar_datos_modificados()
+    conteo['segundos'] = time.perf_counter() - inicio_reloj
+    return conteo
+
+def importar_archivo(ruta, tamano_lote=TAMANO_LOTE):
+    """Importa un archivo .csv, .jsonl o .json. Ver importar_filas."""
+    extension = os.path.splitext(ruta)[1].lower()
+    lector = LECTORES.get(extension)
+    if lector is None:
+        raise ValueError(f"Formato no soportado: '{extension}' (use .csv, .jsonl o .json)")
+    with open(ruta, newline='', encoding='utf-8-sig') as archivo:
+        return importar_filas(lector(archivo), tamano_lote)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa la oferta de materias a la base de datos.")
+    parser.add_argument('archivo', help="Archivo .csv, .jsonl o .json")
+    parser.add_argument('--db', help="Base de datos (por defecto $HORARIO_DB o horario.db)")
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Filas por executemany")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        database.configurar_ruta(args.db)
+    database.inicializar_db()
+
+    try:
+        conteo = importar_archivo(args.archivo, args.lote)
+    except (OSError, ValueError, database.Error) as e:
+        print(f"Error al importar (no se guardo nada): {e}")
+        return 1
+
+    segundos = max(conteo['segundos'], 1e-9)
+    print(
+        f"Importadas {conteo['materias']} materias nuevas, {conteo['opciones']} opciones "
+        f"y {conteo['bloques']} bloques en {conteo['segundos']:.2f} s "
+        f"({conteo['bloques'] / segundos:,.0f} filas/s)."
+    )
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentacion opcional: cronometros y contadores con nombre para la
+busqueda, la base de datos y el pintado, mas un resumen por operacion.
+
+Desactivada por defecto: cada punto de medicion solo compara _registro con
+None (medir devuelve un contexto que no hace nada), asi que el costo es
+despreciable. Los puntos calientes (cada nodo de la busqueda) no pasan por
+aqui: el motor ya cuenta nodos, soluciones y podas en engine.EstadoBusqueda
+y se suman de una vez al terminar con sumar_estado.
+
+  instrumentacion.activar()                    # o HORARIO_DIAGNOSTICO=1
+  instrumentacion.activar(carpeta_perfiles='perfiles') # o HORARIO_PERFIL=perfiles
+  with instrumentacion.operacion('generar'):   # al salir deja el resumen en el log
+      ...
+
+Con carpeta de perfiles cada operacion se ejecuta bajo cProfile y se vuelca
+a '<carpeta>/<operacion>-<n>.prof' (se abre con pstats o snakeviz).
+"""
+import cProfile
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_NULO = nullcontext()
+
+class Registro:
+    """
+    Acumula tiempos (segundos y llamadas) y contadores desde que se activo.
+    Lo usan a la vez el hilo de la interfaz y el del motor.
+    """
+
+    def __init__(self, carpeta_perfiles: Optional[str] = None):
+        self.tiempos: Dict[str, List[float]] = {} # nombre -> [segundos, llamadas]
+        self.contadores: Dict[str, int] = {}
+        self.carpeta_perfiles = carpeta_perfiles
+        self.perfiles_volcados = 0
+        self._candado = threading.Lock()
+        self._perfilando = False # cProfile no admite dos perfiles activos a la vez
+
+    def sumar(self, nombre: str, cantidad: int = 1):
+        with self._candado:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def sumar_tiempo(self, nombre: str, segundos: float):
+        with self._candado:
+            acumulado = self.tiempos.setdefault(nombre, [0.0, 0])
+            acumulado[0] += segundos
+            acumulado[1] += 1
+
+    @contextmanager
+    def medir(self, nombre: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar_tiempo(nombre, time.perf_counter() - inicio)
+
+    def foto(self):
+        """Copia de los acumulados, para restar al final de una operacion."""
+        with self._candado:
+            return ({nombre: tuple(valor) for nombre, valor in self.tiempos.items()},
+                    dict(self.contadores))
+
+class Operacion:
+    """
+    Lo medido entre su creacion y terminar(). Sirve para operaciones que no
+    caben en un bloque with (empiezan en un metodo y terminan en otro).
+    """
+
+    def __init__(self, registro: Registro, nombre: str, perfilar: bool = True):
+        self.registro = registro
+        self.nombre = nombre
+        self.tiempos_previos, self.contadores_previos = registro.foto()
+        self.perfil = None
+        if perfilar and registro.carpeta_perfiles and not registro._perfilando:
+            registro._perfilando = True
+            self.perfil = cProfile.Profile()
+            self.perfil.enable()
+        self.inicio = time.perf_counter()
+
+    def terminar(self) -> str:
+        """Deja el resumen en el log (nivel INFO) y lo devuelve."""
+        segundos = time.perf_counter() - self.inicio
+        if self.perfil is not None:
+            self.perfil.disable()
+            self._volcar_perfil()
+
+        tiempos, contadores = self.registro.foto()
+        partes = []
+        for nombre, (total, llamadas) in tiempos.items():
+            total_previo, llamadas_previas = self.tiempos_previos.get(nombre, (0.0, 0))
+            if llamadas > llamadas_previas:
+                partes.append(f"{nombre} {(total - total_previo) * 1000:.1f} ms"
+                              f" ({llamadas - llamadas_previas}x)")
+        for nombre, valor in contadores.items():
+            diferencia = valor - self.contadores_previos.get(nombre, 0)
+            if diferencia:
+                partes.append(f"{nombre}={diferencia}")
+
+        resumen = f"{self.nombre}: {segundos * 1000:.1f} ms"
+        if partes:
+            resumen += " | " + ", ".join(partes)
+        logger.info(resumen)
+        return resumen
+
+    def _volcar_perfil(self):
+        registro = self.registro
+        registro._perfilando = False
+        registro.perfiles_volcados += 1
+        ruta = os.path.join(registro.carpeta_perfiles, f"{self.nombre}-{registro.perfiles_volcados}.prof")
+        try:
+            os.makedirs(registro.carpeta_perfiles, exist_ok=True)
+            self.perfil.dump_stats(ruta)
+            logger.info("Perfil de %s guardado en %s", self.nombre, ruta)
+        except OSError as e:
+            print(f"No se pudo guardar el perfil {ruta}: {e}")
+
+# --- Activacion ---
+
+_registro: Optional[Registro] = None
+
+def activar(carpeta_perfiles: Optional[str] = None) -> Registro:
+    """Empieza a medir y devuelve el registro para consultarlo."""
+    global _registro
+    _registro = Registro(carpeta_perfiles)
+    return _registro
+
+def desactivar():
+    global _registro
+    _registro = None
+
+def activar_desde_entorno() -> Optional[Registro]:
+    """Activa si HORARIO_DIAGNOSTICO o HORARIO_PERFIL estan definidas."""
+    carpeta = os.environ.get('HORARIO_PERFIL')
+    if carpeta or os.environ.get('HORARIO_DIAGNOSTICO'):
+        return activar(carpeta or None)
+    return None
+
+def activa() -> bool:
+    return _registro is not None
+
+# --- Puntos de Medicion ---
+# Todos terminan enseguida si la instrumentacion esta desactivada.
+
+def medir(nombre: str):
+    """Cronometro: 'with instrumentacion.medir("bd.consultar"): ...'"""
+    registro = _registro
+    if registro is None:
+        return _NULO
+    return registro.medir(nombre)
+
+def sumar(nombre: str, cantidad: int = 1):
+    registro = _registro
+    if registro is not None:
+        registro.sumar(nombre, cantidad)
+
+def sumar_estado(estado, prefijo: str = 'busqueda'):
+    """Suma los contadores de un engine.EstadoBusqueda ya terminado."""
+    registro = _registro
+    if registro is not None:
+        registro.sumar(f"{prefijo}.nodos", estado.nodos)
+        registro.sumar(f"{prefijo}.podas", estado.podas)
+        registro.sumar(f"{prefijo}.soluciones", estado.soluciones)
+
+def iniciar(nombre: str, perfilar: bool = True) -> Optional[Operacion]:
+    """Operacion abierta hasta llamar terminar(); None si esta desactivada."""
+    registro = _registro
+    if registro is None:
+        return None
+    return Operacion(registro, nombre, perfilar)
+
+@contextmanager
+def operacion(nombre: str, perfilar: bool = True):
+    actual = iniciar(nombre, perfilar)
+    try:
+        yield actual
+    finally:
+        if actual is not None:
+            actual.terminar()
@@ -1,10 +1,17 @@
+import logging
 import sys
 from PySide6.QtWidgets import QApplication
 from ui.main_window import VentanaPrincipal
 import database
 import engine
+import instrumentacion
 
 def main():
+    # 0. Diagnostico opcional: HORARIO_DIAGNOSTICO=1 (resumenes en stderr y
+    #    en el panel de la ventana) o HORARIO_PERFIL=carpeta (ademas cProfile)
+    if instrumentacion.activar_desde_entorno():
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+    
     # 1. Asegurar que la base de datos existe
     database.inicializar_db()
     
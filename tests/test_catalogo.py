@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+La copia en memoria de catalogo.py: se reutiliza mientras
+database.version_datos() no cambia y se relee en cuanto cambia. Sobre
+bases temporales (nunca toca horario.db).
+
+Uso: python -m pytest tests   (o python -m unittest tests.test_catalogo)
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import catalogo
+import database
+import instrumentacion
+
+def materia(nombre, dia="Lun"):
+    return {"nombre": nombre, "opciones": [
+        {"profesor": "Perez", "bloques": [{"dia": dia, "inicio": "07:00", "fin": "08:30", "salon": "A1"}]}
+    ]}
+
+class PruebaCatalogo(unittest.TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.carpeta = carpeta.name
+        self.addCleanup(database.configurar_ruta, database.obtener_ruta())
+        self.addCleanup(database.cerrar_conexion)
+        self.registro = instrumentacion.activar()
+        self.addCleanup(instrumentacion.desactivar)
+        self.usar_base('a.db')
+        self.insertar(materia("Calculo"))
+
+    def usar_base(self, nombre):
+        self.ruta = os.path.join(self.carpeta, nombre)
+        database.configurar_ruta(self.ruta)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(database.inicializar_db())
+
+    def insertar(self, datos):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(database.insertar_materia_completa(datos))
+
+    def lecturas(self):
+        """Cuantas veces se leyeron las tablas desde que se activo el registro."""
+        return self.registro.tiempos.get('catalogo.leer', [0.0, 0])[1]
+
+    def nombres(self):
+        return [m.nombre for m in catalogo.materias_para_motor()]
+
+    def test_usa_la_copia_si_no_cambia_nada(self):
+        materias = catalogo.materias_para_motor()
+        lecturas = self.lecturas()
+        self.assertIs(catalogo.materias_para_motor(), materias)
+        self.assertIs(catalogo.filas(), catalogo.filas())
+        self.assertEqual(self.lecturas(), lecturas)
+        self.assertGreater(self.registro.contadores['catalogo.en_cache'], 0)
+
+    def test_relee_tras_escribir(self):
+        self.assertEqual(self.nombres(), ["Calculo"])
+        version = database.version_datos()
+        self.insertar(materia("Fisica", "Mar"))
+        self.assertNotEqual(database.version_datos(), version)
+        self.assertEqual(self.nombres(), ["Calculo", "Fisica"])
+
+        id_materia = database.obtener_materia_por_nombre("Fisica")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(database.eliminar_materia(id_materia))
+        self.assertEqual(self.nombres(), ["Calculo"])
+
+    def test_relee_tras_escritura_de_otra_conexion(self):
+        self.assertEqual(self.nombres(), ["Calculo"])
+        # Como el importador corriendo en otro proceso: solo cambia PRAGMA data_version
+        otra = sqlite3.connect(self.ruta)
+        otra.execute("UPDATE materias SET nombre = 'Calculo I'")
+        otra.commit()
+        otra.close()
+        self.assertEqual(self.nombres(), ["Calculo I"])
+
+    def test_relee_al_cambiar_de_archivo(self):
+        primera = self.ruta
+        self.usar_base('b.db')
+        self.insertar(materia("Quimica"))
+        database.configurar_ruta(primera)
+        self.assertEqual(self.nombres(), ["Calculo"])
+        # Sin escribir nada: solo cambia el archivo
+        database.configurar_ruta(os.path.join(self.carpeta, 'b.db'))
+        self.assertEqual(self.nombres(), ["Quimica"])
+
+    def test_filas_de_materia(self):
+        catalogo.filas()
+        self.insertar(materia("Fisica", "Mar"))
+        # Con la copia vieja se lee directo de la base
+        self.assertEqual([f[0] for f in catalogo.filas_de_materia("FISICA")], ["Fisica"])
+        catalogo.filas()
+        lecturas = self.lecturas()
+        self.assertEqual([f[4] for f in catalogo.filas_de_materia("fisica")], [1])
+        self.assertEqual(self.lecturas(), lecturas)
+
+if __name__ == '__main__':
+    unittest.main()
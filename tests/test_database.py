@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+database.py sobre un archivo temporal (nunca toca horario.db).
+
+Uso: python -m pytest tests   (o python -m unittest tests.test_database)
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import database
+
+MATERIA = {
+    "nombre": "Calculo",
+    "opciones": [
+        {"profesor": "Perez", "bloques": [
+            {"dia": "Lunes", "inicio": "07:00", "fin": "08:30", "salon": "A101"},
+            {"dia": "Mie", "inicio": "07:00", "fin": "08:30", "salon": "A101"},
+        ]},
+    ],
+}
+
+class PruebaBaseDatos(unittest.TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.ruta = os.path.join(carpeta.name, 'prueba.db')
+        database.configurar_ruta(self.ruta)
+        self.addCleanup(database.configurar_ruta, database.obtener_ruta())
+        self.addCleanup(database.cerrar_conexion)
+
+    def silencioso(self, funcion, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return funcion(*args)
+
+    def contar(self, tabla):
+        return database.consultar(f"SELECT COUNT(*) FROM {tabla}")[0][0]
+
+    def test_insertar_y_leer(self):
+        self.assertTrue(self.silencioso(database.inicializar_db))
+        self.assertTrue(self.silencioso(database.insertar_materia_completa, MATERIA))
+        id_materia = database.obtener_materia_por_nombre("CALCULO")
+        materia = database.obtener_materia_con_opciones(id_materia)
+        self.assertEqual([b["dia"] for b in materia["opciones"][0]["bloques"]], ["Lun", "Mie"])
+
+    def test_dia_no_reconocido_no_deja_nada(self):
+        self.assertTrue(self.silencioso(database.inicializar_db))
+        mala = {"nombre": "Fisica", "opciones": [
+            {"profesor": "Lopez", "bloques": [
+                {"dia": "Lun", "inicio": "09:00", "fin": "10:30"},
+                {"dia": "Lnes", "inicio": "11:00", "fin": "12:30"},
+            ]},
+        ]}
+        self.assertFalse(self.silencioso(database.insertar_materia_completa, mala))
+        self.assertEqual(self.contar("materias"), 0)
+
+        self.assertTrue(self.silencioso(database.insertar_materia_completa, MATERIA))
+        id_materia = database.obtener_materia_por_nombre("Calculo")
+        self.assertFalse(self.silencioso(database.insertar_opciones_para_materia, id_materia, mala["opciones"]))
+        self.assertFalse(self.silencioso(database.actualizar_materia_existente, id_materia, mala))
+        self.assertEqual(self.contar("opciones"), 1)
+        self.assertEqual(self.contar("bloques"), 2)
+
+    def test_migracion_con_dia_no_reconocido(self):
+        # Esquema anterior: bloques sin dia_num
+        conexion = sqlite3.connect(self.ruta)
+        conexion.executescript("""
+            CREATE TABLE materias (id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT NOT NULL, codigo TEXT);
+            CREATE TABLE opciones (id INTEGER PRIMARY KEY AUTOINCREMENT, materia_id INTEGER NOT NULL,
+                                   profesor TEXT, salon TEXT);
+            CREATE TABLE bloques (id INTEGER PRIMARY KEY AUTOINCREMENT, opcion_id INTEGER NOT NULL,
+                                  dia TEXT NOT NULL, hora_inicio TEXT NOT NULL, hora_fin TEXT NOT NULL,
+                                  salon TEXT);
+            INSERT INTO materias (nombre) VALUES ('Calculo');
+            INSERT INTO opciones (materia_id, profesor, salon) VALUES (1, 'Perez', 'A101');
+            INSERT INTO bloques (opcion_id, dia, hora_inicio, hora_fin) VALUES (1, 'Lunes', '07:00', '08:30');
+            INSERT INTO bloques (opcion_id, dia, hora_inicio, hora_fin) VALUES (1, 'Lnes', '09:00', '10:30');
+        """)
+        conexion.close()
+
+        salida = io.StringIO()
+        with contextlib.redirect_stdout(salida):
+            self.assertFalse(database.inicializar_db())
+        self.assertIn("bloque 2: 'Lnes'", salida.getvalue())
+        # Se deshizo todo, incluso el ALTER TABLE
+        columnas = [fila[1] for fila in database.consultar("PRAGMA table_info(bloques)")]
+        self.assertNotIn('dia_num', columnas)
+
+        with database.transaccion() as cursor:
+            cursor.execute("UPDATE bloques SET dia = 'Martes' WHERE id = 2")
+        self.assertTrue(self.silencioso(database.inicializar_db))
+        self.assertEqual(database.consultar("SELECT dia_num FROM bloques ORDER BY id"), [(0,), (1,)])
+
+if __name__ == '__main__':
+    unittest.main()
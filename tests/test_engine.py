@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+El motor contra una busqueda de fuerza bruta (itertools.product de todas
+las secciones, revisando choques minuto a minuto) sobre catalogos
+aleatorios con semilla fija.
+
+Uso: python -m pytest tests   (o python -m unittest tests.test_engine)
+"""
+import itertools
+import random
+import unittest
+
+import engine
+from engine import Bloque, Materia, Opcion
+
+DIAS = ("Lunes", "Martes", "Miercoles", "Jueves", "Viernes")
+
+# (materias, secciones, bloques por seccion, franjas, semilla): con menos
+# franjas (horas de inicio posibles) las secciones chocan mas. A lo sumo
+# unos miles de combinaciones cada uno, asi la fuerza bruta es instantanea.
+CATALOGOS = [
+    (3, 6, 2, 12, 2),
+    (3, 5, 3, 30, 0),
+    (4, 5, 2, 20, 0),
+    (4, 6, 2, 60, 1),
+    (5, 4, 1, 30, 0),
+    (5, 5, 1, 20, 0),
+]
+
+RESTRICCIONES = [
+    engine.Restricciones(dias_libres=[engine.Dia.VIE]),
+    engine.Restricciones(ventanas_bloqueadas=[(engine.Dia.LUN, 7 * 60, 10 * 60),
+                                              (engine.Dia.MIE, 12 * 60, 14 * 60)]),
+    engine.Restricciones(max_minutos_dia=180),
+    engine.Restricciones(dias_libres=[engine.Dia.MAR], max_minutos_dia=270),
+]
+
+PESOS = [
+    {"huecos": 1},
+    {"entrada_temprana": 1},
+    {"dias_con_clase": 60, "huecos": 1},
+    {"edificios": 1, "huecos": 1},
+]
+
+def generar_catalogo(materias, secciones, bloques, franjas, semilla):
+    """
+    Secciones de 90 minutos que empiezan en alguna de 'franjas' horas
+    elegidas al azar, sin repetir dia dentro de una misma seccion.
+    """
+    azar = random.Random(semilla)
+    todas = [(dia, inicio) for dia in DIAS for inicio in range(7 * 60, 20 * 60 + 1, 30)]
+    disponibles = azar.sample(todas, franjas)
+
+    catalogo = []
+    id_opcion = 1
+    for m in range(materias):
+        nombre = f"Materia {m + 1}"
+        opciones = []
+        for _ in range(secciones):
+            elegidas, dias = [], set()
+            for dia, inicio in azar.sample(disponibles, len(disponibles)):
+                if dia not in dias:
+                    elegidas.append((dia, inicio))
+                    dias.add(dia)
+                if len(elegidas) == bloques:
+                    break
+            salon = f"{azar.choice('ABC')}{azar.randint(100, 120)}"
+            bloques_seccion = [Bloque(dia, inicio, inicio + 90, salon) for dia, inicio in elegidas]
+            opciones.append(Opcion(id_opcion, nombre, f"Profesor {azar.randint(1, 6)}", salon, bloques_seccion))
+            id_opcion += 1
+        catalogo.append(Materia(m + 1, nombre, opciones))
+    return catalogo
+
+# --- Oraculo ---
+
+def _chocan(a, b):
+    return any(x.dia == y.dia and x.hora_inicio < y.hora_fin and y.hora_inicio < x.hora_fin
+               for x in a.bloques for y in b.bloques)
+
+def _cumple_opcion(materia, opcion, restricciones):
+    profesor = opcion.profesor.strip().lower()
+    if profesor in {p.strip().lower() for p in restricciones.profesores_prohibidos}:
+        return False
+    requerido = restricciones.profesores_requeridos.get(materia.nombre)
+    if requerido is not None and requerido.strip().lower() != profesor:
+        return False
+    for bloque in opcion.bloques:
+        if bloque.dia in restricciones.dias_libres:
+            return False
+        for dia, inicio, fin in restricciones.ventanas_bloqueadas:
+            if bloque.dia == dia and bloque.hora_inicio < fin and inicio < bloque.hora_fin:
+                return False
+    return True
+
+def _cumple_tope(horario, maximo):
+    minutos = {}
+    for opcion in horario:
+        for bloque in opcion.bloques:
+            minutos[bloque.dia] = minutos.get(bloque.dia, 0) + bloque.hora_fin - bloque.hora_inicio
+    return all(total <= maximo for total in minutos.values())
+
+def fuerza_bruta(materias, restricciones=None):
+    """Todos los horarios validos, en el orden de itertools.product."""
+    restricciones = restricciones or engine.Restricciones()
+    candidatas = [[o for o in m.opciones if _cumple_opcion(m, o, restricciones)] for m in materias]
+    horarios = []
+    for horario in itertools.product(*candidatas):
+        if any(_chocan(a, b) for a, b in itertools.combinations(horario, 2)):
+            continue
+        if restricciones.max_minutos_dia is not None and not _cumple_tope(horario, restricciones.max_minutos_dia):
+            continue
+        horarios.append(list(horario))
+    return horarios
+
+def ids(horarios):
+    return [[opcion.id_opcion for opcion in horario] for horario in horarios]
+
+# --- Pruebas ---
+
+class PruebaMotor(unittest.TestCase):
+
+    def catalogos(self):
+        for parametros in CATALOGOS:
+            with self.subTest(catalogo=parametros):
+                yield generar_catalogo(*parametros)
+
+    def test_generar(self):
+        for materias in self.catalogos():
+            esperados = ids(fuerza_bruta(materias))
+            self.assertEqual(ids(engine.generar_combinaciones(materias)), esperados)
+            # El orden por restriccion cambia el orden, no el conjunto
+            self.assertEqual(sorted(ids(engine.generar_combinaciones(materias, ordenar_por_restriccion=True))),
+                             sorted(esperados))
+
+    def test_contar(self):
+        for materias in self.catalogos():
+            self.assertEqual(engine.contar_combinaciones(materias), len(fuerza_bruta(materias)))
+
+    def test_paralelo(self):
+        for materias in self.catalogos():
+            self.assertEqual(ids(engine.generar_combinaciones_paralelo(materias, procesos=2)),
+                             ids(engine.generar_combinaciones(materias)))
+
+    def test_reanudar(self):
+        for materias in self.catalogos():
+            indice = engine.IndiceCompatibilidad(materias)
+            for ordenar in (False, True):
+                todos = list(engine._buscar_indices(indice, ordenar))
+                for n in range(0, len(todos), max(1, len(todos) // 25)):
+                    self.assertEqual(list(engine._buscar_indices(indice, ordenar, reanudar=todos[n])),
+                                     todos[n + 1:])
+
+    def test_restricciones(self):
+        for materias in self.catalogos():
+            profesor = materias[0].opciones[0].profesor
+            casos = RESTRICCIONES + [
+                engine.Restricciones(profesores_prohibidos=[profesor]),
+                engine.Restricciones(profesores_requeridos={materias[0].nombre: profesor}),
+            ]
+            for restricciones in casos:
+                with self.subTest(restricciones=restricciones):
+                    esperados = ids(fuerza_bruta(materias, restricciones))
+                    self.assertEqual(ids(engine.generar_combinaciones(materias, restricciones=restricciones)),
+                                     esperados)
+                    self.assertEqual(engine.contar_combinaciones(materias, restricciones=restricciones),
+                                     len(esperados))
+                    mejores = engine.mejores_horarios(materias, 3, restricciones=restricciones)
+                    self.assertEqual(ids(h for _, h in mejores),
+                                     ids(sorted(fuerza_bruta(materias, restricciones),
+                                                key=engine.costo_horario)[:3]))
+
+    def test_mejores_horarios(self):
+        for materias in self.catalogos():
+            todos = fuerza_bruta(materias)
+            for pesos in PESOS:
+                with self.subTest(pesos=pesos):
+                    # sorted es estable: los empates quedan en orden de aparicion
+                    esperados = sorted(todos, key=lambda h: engine.costo_horario(h, pesos))[:5]
+                    mejores = engine.mejores_horarios(materias, 5, pesos)
+                    self.assertEqual(ids(h for _, h in mejores), ids(esperados))
+                    self.assertEqual([costo for costo, _ in mejores],
+                                     [engine.costo_horario(h, pesos) for h in esperados])
+
+    def test_patrones(self):
+        for materias in self.catalogos():
+            for restricciones in (None, RESTRICCIONES[0], RESTRICCIONES[2]):
+                with self.subTest(restricciones=restricciones):
+                    clases = engine.agrupar_equivalentes(materias, restricciones=restricciones)
+                    patrones = list(engine.iterar_patrones(materias, clases, restricciones=restricciones))
+                    self.assertEqual(engine.contar_patrones(materias, clases, restricciones=restricciones),
+                                     len(patrones))
+                    opciones = [opcion for materia in materias for opcion in materia.opciones]
+                    expandidos = [[opciones[i] for i in seleccion]
+                                  for patron in patrones for seleccion in clases.expandir(patron)]
+                    self.assertEqual(sorted(ids(expandidos)),
+                                     sorted(ids(fuerza_bruta(materias, restricciones))))
+
+if __name__ == '__main__':
+    unittest.main()
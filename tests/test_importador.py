@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+importador.py y exportador.py: lo exportado se vuelve a importar igual,
+sobre bases temporales (nunca toca horario.db).
+
+Uso: python -m pytest tests   (o python -m unittest tests.test_importador)
+"""
+import contextlib
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import database
+import exportador
+import importador
+
+OFERTA_CSV = """materia,profesor,seccion,dia,inicio,fin,salon
+ÁLGEBRA,Perez,1,Lunes,07:00,08:30,A101
+ÁLGEBRA,Perez,1,Miercoles,07:00,08:30,A101
+Álgebra,Lopez,2,Martes,10:00,11:30,B201
+álgebra,Ruiz,1,Jueves,13:00,14:30,C301
+Calculo,Gomez,1,Viernes,07:00,09:00,
+"""
+
+class PruebaImportarExportar(unittest.TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.carpeta = carpeta.name
+        self.addCleanup(database.configurar_ruta, database.obtener_ruta())
+        self.addCleanup(database.cerrar_conexion)
+        self.usar_base('a.db')
+
+    def usar_base(self, nombre):
+        database.configurar_ruta(os.path.join(self.carpeta, nombre))
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(database.inicializar_db())
+
+    def escribir(self, nombre, texto):
+        ruta = os.path.join(self.carpeta, nombre)
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto)
+        return ruta
+
+    def leer(self, ruta):
+        with open(ruta, encoding='utf-8') as archivo:
+            return archivo.read()
+
+    def sin_ids(self, ruta):
+        """El archivo exportado, con los ids de opcion cambiados por su orden."""
+        if ruta.endswith('.jsonl'):
+            materias = [json.loads(linea) for linea in self.leer(ruta).splitlines()]
+            for materia in materias:
+                for opcion in materia["opciones"]:
+                    del opcion["id"]
+            return materias
+        orden = {}
+        return [fila[:2] + [orden.setdefault(fila[2], len(orden))] + fila[3:]
+                for fila in csv.reader(io.StringIO(self.leer(ruta)))]
+
+    def test_mayusculas_como_sqlite(self):
+        # LOWER() de SQLite no cambia 'Á': 'ÁLGEBRA' y 'Álgebra' son la misma
+        # materia, 'álgebra' es otra
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.insertar_materia_completa({"nombre": "ÁLGEBRA", "opciones": [
+                {"profesor": "Diaz", "bloques": [{"dia": "Sab", "inicio": "08:00", "fin": "10:00"}]}
+            ]})
+        conteo = importador.importar_archivo(self.escribir('oferta.csv', OFERTA_CSV))
+        self.assertEqual((conteo['materias'], conteo['opciones'], conteo['bloques']), (2, 4, 5))
+
+        materias = list(exportador.materias_catalogo())
+        self.assertEqual([m["nombre"] for m in materias], ["Calculo", "ÁLGEBRA", "álgebra"])
+        self.assertEqual([o["profesor"] for o in materias[1]["opciones"]], ["Diaz", "Perez", "Lopez"])
+
+    def test_ida_y_vuelta(self):
+        importador.importar_archivo(self.escribir('oferta.csv', OFERTA_CSV))
+        for extension in ('.csv', '.jsonl'):
+            with self.subTest(formato=extension):
+                self.usar_base('a.db')
+                primera = os.path.join(self.carpeta, 'primera' + extension)
+                exportador.exportar_catalogo(primera)
+
+                self.usar_base(f'b{extension}.db')
+                importador.importar_archivo(primera)
+                segunda = os.path.join(self.carpeta, 'segunda' + extension)
+                exportador.exportar_catalogo(segunda)
+
+                # Los ids de opcion de la base nueva pueden ser otros
+                self.assertEqual(self.sin_ids(segunda), self.sin_ids(primera))
+
+    def test_fila_invalida_no_guarda_nada(self):
+        ruta = self.escribir('mala.csv', OFERTA_CSV + "Fisica,Lopez,1,Lnes,07:00,08:30,A1\n")
+        with self.assertRaises(ValueError):
+            importador.importar_archivo(ruta)
+        self.assertEqual(database.consultar("SELECT COUNT(*) FROM materias"), [(0,)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+ui.intervalos.IndiceIntervalos (no necesita Qt), con casos a mano y contra
+un conjunto de minutos ocupados sobre bloques aleatorios.
+
+Uso: python -m pytest tests   (o python -m unittest tests.test_intervalos)
+"""
+import random
+import unittest
+
+from ui.intervalos import IndiceIntervalos
+
+LUN, MAR = 0, 1
+
+def intervalos(indice, dia):
+    return list(zip(indice.inicios[dia], indice.fines[dia]))
+
+class PruebaIntervalos(unittest.TestCase):
+
+    def test_choca_con_precision_de_minutos(self):
+        indice = IndiceIntervalos(5)
+        indice.agregar(LUN, 7 * 60, 7 * 60 + 50) # 07:00-07:50
+        self.assertTrue(indice.choca(LUN, 7 * 60 + 30, 9 * 60))
+        # Misma media hora pero sin encimarse
+        self.assertFalse(indice.choca(LUN, 7 * 60 + 50, 9 * 60))
+        self.assertFalse(indice.choca(LUN, 6 * 60, 7 * 60))
+        self.assertFalse(indice.choca(MAR, 7 * 60, 8 * 60))
+
+    def test_agregar_funde_los_que_se_enciman(self):
+        indice = IndiceIntervalos(1)
+        indice.agregar(LUN, 600, 660)
+        indice.agregar(LUN, 420, 480)
+        indice.agregar(LUN, 480, 540) # Solo se tocan: quedan separados
+        self.assertEqual(intervalos(indice, LUN), [(420, 480), (480, 540), (600, 660)])
+        indice.agregar(LUN, 500, 620)
+        self.assertEqual(intervalos(indice, LUN), [(420, 480), (480, 660)])
+        indice.agregar(LUN, 400, 700)
+        self.assertEqual(intervalos(indice, LUN), [(400, 700)])
+
+    def test_quitar_borra_el_intervalo_fundido(self):
+        indice = IndiceIntervalos(2)
+        indice.agregar(LUN, 420, 510)
+        indice.agregar(LUN, 480, 570)
+        indice.agregar(LUN, 600, 690)
+        indice.agregar(MAR, 420, 510)
+        indice.quitar(LUN, 420, 510)
+        self.assertEqual(intervalos(indice, LUN), [(600, 690)])
+        self.assertFalse(indice.choca(LUN, 480, 570))
+        indice.quitar(LUN, 480, 570) # Ya no estaba: no hace nada
+        self.assertEqual(intervalos(indice, LUN), [(600, 690)])
+        self.assertEqual(intervalos(indice, MAR), [(420, 510)])
+
+    def test_contra_minutos_ocupados(self):
+        azar = random.Random(0)
+        for _ in range(200):
+            indice = IndiceIntervalos(2)
+            ocupados = [set(), set()]
+            bloques = []
+            for _ in range(azar.randint(1, 12)):
+                dia = azar.randrange(2)
+                inicio = azar.randrange(7 * 60, 20 * 60, 10)
+                fin = inicio + azar.choice((50, 60, 90, 120))
+                minutos = set(range(inicio, fin))
+                self.assertEqual(indice.choca(dia, inicio, fin), bool(minutos & ocupados[dia]))
+                indice.agregar(dia, inicio, fin)
+                ocupados[dia] |= minutos
+                bloques.append((dia, inicio, fin))
+
+                for d in range(2):
+                    inicios, fines = indice.inicios[d], indice.fines[d]
+                    self.assertTrue(all(a < b for a, b in zip(inicios, fines)))
+                    self.assertTrue(all(b <= a for b, a in zip(fines, inicios[1:])))
+                    self.assertEqual(set().union(*(range(a, b) for a, b in zip(inicios, fines))),
+                                     ocupados[d])
+
+            # Como al repintar la cuadricula: se quitan todos, en cualquier orden
+            azar.shuffle(bloques)
+            for dia, inicio, fin in bloques:
+                indice.quitar(dia, inicio, fin)
+                self.assertFalse(indice.choca(dia, inicio, fin))
+            self.assertEqual(indice.inicios, [[], []])
+            self.assertEqual(indice.fines, [[], []])
+
+if __name__ == '__main__':
+    unittest.main()
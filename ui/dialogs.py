@@ -1,9 +1,12 @@
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout,
                                QLabel, QLineEdit, QTimeEdit,
                                QComboBox, QPushButton, QGroupBox,
-                               QListWidget, QMessageBox)
+                               QListWidget, QMessageBox, QCheckBox,
+                               QDoubleSpinBox, QListWidgetItem)
 from PySide6.QtCore import QTime, Qt
 
+from engine import DIAS, Restricciones, minutos_a_hora
+
 class DialogoMateria(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -41,7 +44,7 @@ class DialogoMateria(QDialog):
 
         # Selector de Dia
         self.combo_dias = QComboBox()
-        self.combo_dias.addItems(["Lun", "Mar", "Mie", "Jue", "Vie", "Sab", "Dom"])
+        self.combo_dias.addItems(list(DIAS))
         layout_horario.addWidget(self.combo_dias)
 
         self.input_salon_bloque = QLineEdit()
@@ -263,4 +266,230 @@ class DialogoMateria(QDialog):
     def _texto_opcion(self, opcion, indice):
         profesor = opcion.get('profesor', '').strip() or 'Profesor Pendiente'
         bloques = opcion.get('bloques', [])
-        return f"Alternativa {indice + 1}: {profesor} ({len(bloques)} bloques)"
\ No newline at end of file
+        return f"Alternativa {indice + 1}: {profesor} ({len(bloques)} bloques)"
+
+
+class DialogoRestricciones(QDialog):
+    """
+    Edita las restricciones de la generacion (engine.Restricciones): dias
+    sin clases, horas bloqueadas, profesores obligatorios o vetados y un
+    tope de horas de clase por dia.
+    """
+    def __init__(self, materias, restricciones=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Restricciones de la Generacion")
+        self.setFixedWidth(500)
+        self.materias = materias
+        self.ventanas = []   # (dia, inicio, fin) en minutos
+        self.requeridos = {} # materia -> profesor
+
+        layout = QVBoxLayout(self)
+
+        # --- 1. Dias sin clases ---
+        grupo_dias = QGroupBox("Dias sin clases")
+        layout_dias = QHBoxLayout(grupo_dias)
+        self.checks_dias = []
+        for dia in DIAS:
+            check = QCheckBox(dia)
+            self.checks_dias.append(check)
+            layout_dias.addWidget(check)
+        layout.addWidget(grupo_dias)
+
+        # --- 2. Horas bloqueadas ---
+        grupo_ventanas = QGroupBox("Horas bloqueadas (trabajo, transporte...)")
+        layout_ventanas = QVBoxLayout(grupo_ventanas)
+
+        layout_ventana = QHBoxLayout()
+        self.combo_dia_ventana = QComboBox()
+        self.combo_dia_ventana.addItems(list(DIAS))
+        layout_ventana.addWidget(self.combo_dia_ventana)
+
+        self.time_inicio = QTimeEdit()
+        self.time_inicio.setDisplayFormat("HH:mm")
+        self.time_inicio.setTime(QTime(7, 0))
+        layout_ventana.addWidget(self.time_inicio)
+
+        layout_ventana.addWidget(QLabel("a"))
+
+        self.time_fin = QTimeEdit()
+        self.time_fin.setDisplayFormat("HH:mm")
+        self.time_fin.setTime(QTime(9, 0))
+        layout_ventana.addWidget(self.time_fin)
+
+        self.btn_agregar_ventana = QPushButton(" + ")
+        self.btn_agregar_ventana.setStyleSheet("background-color: #3498db; color: white; font-weight: bold;")
+        self.btn_agregar_ventana.clicked.connect(self.agregar_ventana)
+        layout_ventana.addWidget(self.btn_agregar_ventana)
+        layout_ventanas.addLayout(layout_ventana)
+
+        self.lista_ventanas = QListWidget()
+        self.lista_ventanas.setFixedHeight(80)
+        layout_ventanas.addWidget(self.lista_ventanas)
+
+        self.btn_quitar_ventana = QPushButton("Quitar Horario Seleccionado")
+        self.btn_quitar_ventana.clicked.connect(self.quitar_ventana)
+        layout_ventanas.addWidget(self.btn_quitar_ventana)
+        layout.addWidget(grupo_ventanas)
+
+        # --- 3. Profesores ---
+        grupo_profesores = QGroupBox("Profesores")
+        layout_profesores = QVBoxLayout(grupo_profesores)
+
+        layout_profesores.addWidget(QLabel("Tomar una materia solo con este profesor:"))
+        layout_requerido = QHBoxLayout()
+        self.combo_materia = QComboBox()
+        self.combo_materia.addItems([materia.nombre for materia in materias])
+        self.combo_materia.currentIndexChanged.connect(self.actualizar_profesores_materia)
+        layout_requerido.addWidget(self.combo_materia)
+
+        self.combo_profesor = QComboBox()
+        layout_requerido.addWidget(self.combo_profesor)
+
+        self.btn_agregar_requerido = QPushButton(" + ")
+        self.btn_agregar_requerido.setStyleSheet("background-color: #3498db; color: white; font-weight: bold;")
+        self.btn_agregar_requerido.clicked.connect(self.agregar_requerido)
+        layout_requerido.addWidget(self.btn_agregar_requerido)
+        layout_profesores.addLayout(layout_requerido)
+
+        self.lista_requeridos = QListWidget()
+        self.lista_requeridos.setFixedHeight(60)
+        layout_profesores.addWidget(self.lista_requeridos)
+
+        self.btn_quitar_requerido = QPushButton("Quitar Seleccionado")
+        self.btn_quitar_requerido.clicked.connect(self.quitar_requerido)
+        layout_profesores.addWidget(self.btn_quitar_requerido)
+
+        layout_profesores.addWidget(QLabel("Profesores vetados (marcalos):"))
+        self.lista_prohibidos = QListWidget()
+        self.lista_prohibidos.setFixedHeight(100)
+        profesores = sorted({o.profesor for materia in materias for o in materia.opciones if o.profesor})
+        for profesor in profesores:
+            item = QListWidgetItem(profesor)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            self.lista_prohibidos.addItem(item)
+        layout_profesores.addWidget(self.lista_prohibidos)
+        layout.addWidget(grupo_profesores)
+
+        # --- 4. Tope diario ---
+        layout_tope = QHBoxLayout()
+        layout_tope.addWidget(QLabel("Maximo de horas de clase por dia:"))
+        self.spin_max_horas = QDoubleSpinBox()
+        self.spin_max_horas.setRange(0, 24)
+        self.spin_max_horas.setSingleStep(0.5)
+        self.spin_max_horas.setDecimals(1)
+        self.spin_max_horas.setSpecialValueText("Sin limite") # Se muestra en 0
+        layout_tope.addWidget(self.spin_max_horas)
+        layout.addLayout(layout_tope)
+
+        # --- 5. Botones Finales ---
+        btn_layout = QHBoxLayout()
+        self.btn_limpiar = QPushButton("Quitar Todas")
+        self.btn_limpiar.clicked.connect(self.limpiar)
+
+        self.btn_cancelar = QPushButton("Cancelar")
+        self.btn_cancelar.clicked.connect(self.reject)
+
+        self.btn_aceptar = QPushButton("Aplicar")
+        self.btn_aceptar.setStyleSheet("padding: 8px;")
+        self.btn_aceptar.clicked.connect(self.accept)
+
+        btn_layout.addWidget(self.btn_limpiar)
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.btn_cancelar)
+        btn_layout.addWidget(self.btn_aceptar)
+        layout.addLayout(btn_layout)
+
+        self.actualizar_profesores_materia()
+        if restricciones is not None:
+            self.cargar_restricciones(restricciones)
+
+    # --- Horas bloqueadas ---
+    def agregar_ventana(self):
+        if self.time_inicio.time() >= self.time_fin.time():
+            QMessageBox.warning(self, "Error", "La hora de inicio debe ser menor a la final.")
+            return
+        inicio = self.time_inicio.time()
+        fin = self.time_fin.time()
+        self._agregar_ventana(self.combo_dia_ventana.currentIndex(),
+                              inicio.hour() * 60 + inicio.minute(), fin.hour() * 60 + fin.minute())
+
+    def _agregar_ventana(self, dia, inicio, fin):
+        self.ventanas.append((dia, inicio, fin))
+        self.lista_ventanas.addItem(f"{DIAS[dia]}: {minutos_a_hora(inicio)} - {minutos_a_hora(fin)}")
+
+    def quitar_ventana(self):
+        fila = self.lista_ventanas.currentRow()
+        if fila >= 0:
+            self.lista_ventanas.takeItem(fila)
+            del self.ventanas[fila]
+
+    # --- Profesores ---
+    def actualizar_profesores_materia(self):
+        self.combo_profesor.clear()
+        fila = self.combo_materia.currentIndex()
+        if 0 <= fila < len(self.materias):
+            profesores = dict.fromkeys(o.profesor for o in self.materias[fila].opciones)
+            self.combo_profesor.addItems(list(profesores))
+
+    def agregar_requerido(self):
+        materia = self.combo_materia.currentText()
+        profesor = self.combo_profesor.currentText()
+        if materia and profesor:
+            self._agregar_requerido(materia, profesor)
+
+    def _agregar_requerido(self, materia, profesor):
+        # Una materia solo puede exigir un profesor: el nuevo reemplaza al anterior
+        self.requeridos.pop(materia, None)
+        self.requeridos[materia] = profesor
+        self.lista_requeridos.clear()
+        for nombre, requerido in self.requeridos.items():
+            self.lista_requeridos.addItem(f"{nombre}: {requerido}")
+
+    def quitar_requerido(self):
+        fila = self.lista_requeridos.currentRow()
+        if fila >= 0:
+            self.lista_requeridos.takeItem(fila)
+            del self.requeridos[list(self.requeridos)[fila]]
+
+    # --- Carga y lectura ---
+    def limpiar(self):
+        for check in self.checks_dias:
+            check.setChecked(False)
+        self.ventanas = []
+        self.lista_ventanas.clear()
+        self.requeridos = {}
+        self.lista_requeridos.clear()
+        for fila in range(self.lista_prohibidos.count()):
+            self.lista_prohibidos.item(fila).setCheckState(Qt.Unchecked)
+        self.spin_max_horas.setValue(0)
+
+    def cargar_restricciones(self, restricciones):
+        """Rellena el formulario con restricciones existentes."""
+        self.limpiar()
+        for dia in restricciones.dias_libres:
+            self.checks_dias[dia].setChecked(True)
+        for dia, inicio, fin in restricciones.ventanas_bloqueadas:
+            self._agregar_ventana(dia, inicio, fin)
+        for materia, profesor in restricciones.profesores_requeridos.items():
+            self._agregar_requerido(materia, profesor)
+        prohibidos = set(restricciones.profesores_prohibidos)
+        for fila in range(self.lista_prohibidos.count()):
+            item = self.lista_prohibidos.item(fila)
+            item.setCheckState(Qt.Checked if item.text() in prohibidos else Qt.Unchecked)
+        if restricciones.max_minutos_dia is not None:
+            self.spin_max_horas.setValue(restricciones.max_minutos_dia / 60)
+
+    def obtener_restricciones(self):
+        horas = self.spin_max_horas.value()
+        return Restricciones(
+            ventanas_bloqueadas=list(self.ventanas),
+            dias_libres=[dia for dia, check in enumerate(self.checks_dias) if check.isChecked()],
+            profesores_requeridos=dict(self.requeridos),
+            profesores_prohibidos=[
+                self.lista_prohibidos.item(fila).text()
+                for fila in range(self.lista_prohibidos.count())
+                if self.lista_prohibidos.item(fila).checkState() == Qt.Checked
+            ],
+            max_minutos_dia=round(horas * 60) if horas > 0 else None
+        )
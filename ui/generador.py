@@ -0,0 +1,87 @@
+from PySide6.QtCore import QObject, Signal, Slot
+
+import engine
+import instrumentacion
+
+class TrabajadorGenerador(QObject):
+    """
+    Ejecuta el motor de horarios fuera del hilo de la interfaz.
+
+    Primero cuenta las combinaciones (para la barra de progreso) y luego las
+    envia en lotes de tuplas de indices de opcion (ver
+    engine.ResultadosCompactos). Con 'pesos' solo busca los 'k' mejores
+    horarios (engine.mejores_selecciones) y los envia en un lote, del mejor
+    al peor. Con 'clases' (engine.agrupar_equivalentes) envia un patron por
+    grupo de secciones con el mismo horario (engine.iterar_patrones). Las
+    restricciones (engine.Restricciones) se aplican dentro de la busqueda.
+    Los contadores de progreso viven en self.estado y la ventana los
+    consulta con un temporizador, asi el motor no emite una senal por cada
+    nodo visitado.
+    """
+    total_calculado = Signal(object) # int de Python (puede pasar de 2**31) o None si no se conoce
+    lote_listo = Signal(list)
+    terminado = Signal(bool) # True si el usuario cancelo
+
+    def __init__(self, materias, tamano_lote=50, pesos=None, k=20, restricciones=None, clases=None):
+        super().__init__()
+        self.materias = materias
+        self.tamano_lote = tamano_lote
+        self.pesos = pesos
+        self.k = k
+        self.restricciones = restricciones
+        self.clases = clases
+        self.estado = engine.EstadoBusqueda()
+
+    @Slot()
+    def ejecutar(self):
+        # Con la instrumentacion activa queda un resumen (y el perfil, si se
+        # pidio) de lo que corrio en este hilo
+        with instrumentacion.operacion('busqueda'):
+            if self.pesos:
+                self.ejecutar_mejores()
+            else:
+                self.ejecutar_todos()
+            instrumentacion.sumar_estado(self.estado)
+        self.terminado.emit(self.estado.cancelado)
+
+    def ejecutar_todos(self):
+        with instrumentacion.medir('motor.contar'):
+            if self.restricciones is not None and self.restricciones.max_minutos_dia is not None:
+                total = None # Con tope diario contarlos cuesta lo mismo que generarlos
+            elif self.clases is not None:
+                total = engine.contar_patrones(self.materias, self.clases, restricciones=self.restricciones,
+                                               estado=self.estado)
+            else:
+                total = engine.contar_combinaciones(self.materias, restricciones=self.restricciones,
+                                                    estado=self.estado)
+        self.total_calculado.emit(total)
+
+        if self.clases is not None:
+            selecciones = engine.iterar_patrones(self.materias, self.clases, estado=self.estado,
+                                                 restricciones=self.restricciones)
+        else:
+            selecciones = engine.iterar_selecciones(self.materias, estado=self.estado,
+                                                    restricciones=self.restricciones)
+        lote = []
+        with instrumentacion.medir('motor.generar'):
+            if total != 0 and not self.estado.cancelado:
+                for seleccion in selecciones:
+                    lote.append(seleccion)
+                    if len(lote) >= self.tamano_lote:
+                        self.lote_listo.emit(lote)
+                        lote = []
+
+        if lote:
+            self.lote_listo.emit(lote)
+
+    def ejecutar_mejores(self):
+        with instrumentacion.medir('motor.mejores'):
+            mejores = engine.mejores_selecciones(self.materias, self.k, self.pesos, estado=self.estado,
+                                                 restricciones=self.restricciones)
+        self.total_calculado.emit(len(mejores))
+        if mejores:
+            self.lote_listo.emit([seleccion for _, seleccion in mejores])
+
+    def cancelar(self):
+        """Se llama desde el hilo de la interfaz; el motor se detiene en el siguiente nodo."""
+        self.estado.cancelado = True
@@ -1,8 +1,13 @@
-from PySide6.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+from PySide6.QtWidgets import QTableView, QStyledItemDelegate, QHeaderView, QAbstractItemView
 from PySide6.QtGui import QColor, QPainter, QFont, QPen
-from PySide6.QtCore import Qt, QRect
+from PySide6.QtCore import Qt, QRect, QAbstractTableModel, QModelIndex
+from array import array
 import random
 
+from engine import DIAS, Dia
+from ui.intervalos import IndiceIntervalos
+import instrumentacion
+
 class HeaderRegla(QHeaderView):
     def __init__(self, parent=None):
         super().__init__(Qt.Vertical, parent)
@@ -70,44 +75,198 @@ class HeaderRegla(QHeaderView):
                 rect_fin = QRect(0, rect.bottom() - 20, width - 5, 20)
                 painter.drawText(rect_fin, Qt.AlignRight | Qt.AlignBottom, texto_fin)
 
-class HorarioGrid(QTableWidget):
+# --- MODELO ---
+
+COLOR_POR_DEFECTO = "#3498db"
+COLOR_CHOQUE = "#e74c3c" # Rojo
+TEXTO_CHOQUE = "!!! CHOQUE MULTIPLE\n(Ver detalles)"
+
+class Tarjeta:
+    """
+    Un bloque pintado que ocupa filas seguidas de una columna. Si otros
+    bloques caen en esas filas se agregan a sus textos; 'choque' indica si
+    alguno se encima en minutos (y no solo en la misma media hora).
+    """
+    __slots__ = ('fila', 'columna', 'duracion', 'textos', 'tooltip', 'color', 'choque')
+
+    def __init__(self, fila, columna, duracion, texto, tooltip, color, choque=False):
+        self.fila = fila
+        self.columna = columna
+        self.duracion = duracion
+        self.textos = [texto] # Uno por bloque que cae en estas filas
+        self.tooltip = tooltip
+        self.color = color
+        self.choque = choque
+
+class ModeloHorario(QAbstractTableModel):
+    """
+    Datos de la cuadricula: una lista de tarjetas y un arreglo plano de
+    ocupacion (fila * columnas + columna -> indice de tarjeta, o -1). No hay
+    un objeto por celda; la vista pide texto, color y tooltip solo de las
+    celdas que dibuja.
+    """
+
+    def __init__(self, dias, hora_inicio, total_filas, parent=None):
+        super().__init__(parent)
+        self.dias = dias
+        self.total_filas = total_filas
+        self.etiquetas_horas = [
+            f"{(hora_inicio * 60 + 30 * fila) // 60:02d}:{(30 * fila) % 60:02d}"
+            for fila in range(total_filas)
+        ]
+        self.tarjetas = []
+        self.libres = [] # Posiciones de tarjetas borradas, para reutilizar
+        self.ocupacion = array('i', [-1]) * (total_filas * len(dias))
+        self.en_lote = False
+
+    # Interfaz de QAbstractTableModel
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.total_filas
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.dias)
+
+    def headerData(self, seccion, orientacion, rol=Qt.DisplayRole):
+        if rol != Qt.DisplayRole:
+            return None
+        if orientacion == Qt.Horizontal:
+            return self.dias[seccion]
+        return self.etiquetas_horas[seccion]
+
+    def data(self, index, rol=Qt.DisplayRole):
+        tarjeta = self.tarjeta_en(index.row(), index.column())
+        # Solo la celda superior (la que abarca el span) muestra el bloque
+        if tarjeta is None or tarjeta.fila != index.row():
+            return None
+
+        choque = tarjeta.choque
+        if rol == Qt.DisplayRole:
+            return TEXTO_CHOQUE if choque else "\n\n".join(tarjeta.textos)
+        if rol == Qt.ToolTipRole:
+            if len(tarjeta.textos) == 1:
+                return tarjeta.tooltip
+            # Lista numerada, construida solo cuando se pide el tooltip
+            encabezado = "!!! CONFLICTO DETECTADO !!!" if choque else "Misma franja, sin choque:"
+            return encabezado + "".join(
+                f"\n\n{i}. {texto}" for i, texto in enumerate(tarjeta.textos, 1)
+            )
+        if rol == Qt.BackgroundRole:
+            return QColor(COLOR_CHOQUE if choque else tarjeta.color)
+        if rol == Qt.ForegroundRole:
+            return QColor("white")
+        if rol == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if rol == Qt.UserRole:
+            return list(tarjeta.textos)
+        return None
+
+    # Consultas
+    def indice_en(self, fila, columna):
+        return self.ocupacion[fila * len(self.dias) + columna]
+
+    def tarjeta_en(self, fila, columna):
+        if not (0 <= fila < self.total_filas and 0 <= columna < len(self.dias)):
+            return None
+        indice = self.indice_en(fila, columna)
+        return self.tarjetas[indice] if indice >= 0 else None
+
+    # Cambios
+    def _avisar(self, tarjeta):
+        if not self.en_lote:
+            celda = self.index(tarjeta.fila, tarjeta.columna)
+            self.dataChanged.emit(celda, celda)
+
+    def reiniciar(self):
+        if not self.en_lote:
+            self.beginResetModel()
+        self.tarjetas = []
+        self.libres = []
+        self.ocupacion = array('i', [-1]) * (self.total_filas * len(self.dias))
+        if not self.en_lote:
+            self.endResetModel()
+
+    def ocupar(self, tarjeta):
+        """Coloca una tarjeta en celdas libres y devuelve su indice."""
+        if self.libres:
+            indice = self.libres.pop()
+            self.tarjetas[indice] = tarjeta
+        else:
+            indice = len(self.tarjetas)
+            self.tarjetas.append(tarjeta)
+        columnas = len(self.dias)
+        for fila in range(tarjeta.fila, tarjeta.fila + tarjeta.duracion):
+            self.ocupacion[fila * columnas + tarjeta.columna] = indice
+        self._avisar(tarjeta)
+        return indice
+
+    def agregar_texto(self, indice, texto, choque):
+        tarjeta = self.tarjetas[indice]
+        tarjeta.textos.append(texto)
+        tarjeta.choque = tarjeta.choque or choque
+        self._avisar(tarjeta)
+
+    def liberar(self, indice):
+        tarjeta = self.tarjetas[indice]
+        columnas = len(self.dias)
+        for fila in range(tarjeta.fila, tarjeta.fila + tarjeta.duracion):
+            self.ocupacion[fila * columnas + tarjeta.columna] = -1
+        self.tarjetas[indice] = None
+        self.libres.append(indice)
+        self._avisar(tarjeta)
+
+class DelegadoBloque(QStyledItemDelegate):
+    """Dibuja cada bloque directamente: fondo de color y texto centrado."""
+
+    def paint(self, painter, option, index):
+        color = index.data(Qt.BackgroundRole)
+        if color is None:
+            super().paint(painter, option, index) # Celda vacia
+            return
+
+        instrumentacion.sumar('grid.celdas_pintadas')
+        painter.save()
+        rect = option.rect.adjusted(1, 1, -1, -1)
+        painter.fillRect(rect, color)
+        painter.setPen(index.data(Qt.ForegroundRole))
+        painter.drawText(rect.adjusted(4, 2, -4, -2), Qt.AlignCenter | Qt.TextWordWrap,
+                         index.data(Qt.DisplayRole))
+        painter.restore()
+
+# --- VISTA ---
+
+class HorarioGrid(QTableView):
     def __init__(self):
         super().__init__()
         
-        self.dias = ["Lun", "Mar", "Mie", "Jue", "Vie", "Sab", "Dom"]
+        self.dias = list(DIAS) # Columna = Dia.LUN .. Dia.DOM
         self.hora_inicio = 7
         self.hora_fin = 24 # Hasta media noche
         self.total_filas = (self.hora_fin - self.hora_inicio) * 2
         
         # --- MEMORIA LOGICA ---
-        # Diccionario para saber quien ocupa que celda realmente
-        self.celdas_ocupadas = {} 
+        # El modelo sabe quien ocupa que celda realmente (ModeloHorario.ocupacion)
+        self.modelo = ModeloHorario(self.dias, self.hora_inicio, self.total_filas, self)
+        # ...y el indice de intervalos, que minutos de cada dia estan ocupados
+        self.intervalos = IndiceIntervalos(len(self.dias))
+        
+        # --- REGISTRO PARA ACTUALIZACION INCREMENTAL ---
+        # Solo lo usan los bloques pintados con agregar_bloque (vista global).
+        # Cada bloque recibe un numero creciente: repintar en ese orden da el
+        # mismo resultado (incluidos los choques) que repintar todo.
+        self.bloques = {}            # id -> (grupo, columna, fila_ini, fila_fin, datos)
+        self.bloques_por_grupo = {}  # grupo -> [id, ...]
+        self.bloques_en_celda = {}   # (fila, columna) -> {id, ...}
+        self.siguiente_bloque = 0
         
         self.setup_ui()
         
     def setup_ui(self):
-        # 1. Dimensiones de la tabla
-        self.setColumnCount(len(self.dias))
-        self.setRowCount(self.total_filas)
-        
-        # 2. Encabezados Horizontales (Dias)
-        self.setHorizontalHeaderLabels(self.dias)
-        
-        # 3. Encabezados Verticales (Horas)
-        # Generamos etiquetas base. Aunque HeaderRegla hace su propio calculo visual,
-        # es importante setear esto para que la tabla tenga la estructura correcta.
-        horas_labels = []
-        for h in range(self.hora_inicio, self.hora_fin):
-            horas_labels.append(f"{h:02d}:00")
-            horas_labels.append(f"{h:02d}:30")
-            
-        # Nos aseguramos que la lista de etiquetas coincida con las filas totales
-        if len(horas_labels) > self.total_filas:
-            horas_labels = horas_labels[:self.total_filas]
-            
-        self.setVerticalHeaderLabels(horas_labels)
+        # 1. Modelo (dimensiones y encabezados de dias/horas) y delegado que
+        #    dibuja los bloques
+        self.setModel(self.modelo)
+        self.setItemDelegate(DelegadoBloque(self))
         
-        # 4. Ajustes Visuales y de Comportamiento
+        # 2. Ajustes Visuales y de Comportamiento
         # Estirar columnas para llenar el espacio
         self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         # Desactivar edicion y seleccion para que sea solo visual
@@ -116,7 +275,7 @@ class HorarioGrid(QTableWidget):
         # Filas con colores alternados (Zebrastripe) para guiar el ojo
         self.setAlternatingRowColors(True)
 
-        # 5. ACTIVAR EL HEADER PERSONALIZADO (El "Eje de Tiempo")
+        # 3. ACTIVAR EL HEADER PERSONALIZADO (El "Eje de Tiempo")
         # Instanciamos la clase que dibuja en el "techo" de la celda
         self.header_regla = HeaderRegla(self)
         
@@ -128,89 +287,163 @@ class HorarioGrid(QTableWidget):
 
         self.verticalScrollBar().valueChanged.connect(self.verticalHeader().viewport().update)
 
+    def rowCount(self):
+        return self.modelo.rowCount()
+
     def limpiar(self):
         """Borra todo, incluyendo la memoria logica."""
-        self.clearContents()
+        self.modelo.reiniciar()
+        self.intervalos = IndiceIntervalos(len(self.dias))
         self.clearSpans()
-        self.celdas_ocupadas = {} 
+        self.bloques = {}
+        self.bloques_por_grupo = {}
+        self.bloques_en_celda = {}
+
+    def cargar_bloques(self, bloques):
+        """
+        Reemplaza todo el contenido por 'bloques' (tuplas con los argumentos
+        de pintar_bloque) con un solo aviso a la vista.
+        """
+        with instrumentacion.medir('grid.cargar_bloques'):
+            self.modelo.beginResetModel()
+            self.modelo.en_lote = True
+            try:
+                self.limpiar()
+                for datos in bloques:
+                    self.pintar_bloque(*datos)
+            finally:
+                self.modelo.en_lote = False
+                self.modelo.endResetModel()
+
+    def _ubicar(self, dia, h_inicio_str, h_fin_str):
+        """
+        Columna, minutos [inicio, fin) y filas [inicio, fin) de un bloque,
+        con las filas recortadas a la cuadricula. Un bloque ocupa toda media
+        hora que toca (07:50-08:40 va de la fila de 07:30 a la de 08:30).
+        """
+        # El dia llega como entero (Dia); el texto se acepta por compatibilidad
+        if isinstance(dia, str): dia = Dia.desde_texto(dia)
+        col = int(dia)
+        
+        # Calculo de filas
+        h_ini, m_ini = map(int, h_inicio_str.split(':'))
+        h_fin, m_fin = map(int, h_fin_str.split(':'))
+        inicio = h_ini * 60 + m_ini
+        fin = h_fin * 60 + m_fin
+        base = self.hora_inicio * 60
+        row_start = (inicio - base) // 30
+        row_end = -((base - fin) // 30) # Division hacia arriba
+        return col, inicio, fin, max(row_start, 0), min(row_end, self.total_filas)
+
+    # --- ACTUALIZACION INCREMENTAL ---
+
+    def agregar_bloque(self, grupo, nombre_materia, profesor, salon, dia, h_inicio_str, h_fin_str, color_hex=None):
+        """
+        Igual que pintar_bloque, pero recuerda el bloque bajo 'grupo' (la
+        materia) para poder quitarlo o reemplazarlo despues sin repintar todo.
+        """
+        datos = (nombre_materia, profesor, salon, dia, h_inicio_str, h_fin_str, color_hex)
+        self._registrar_bloque(grupo, datos)
+        self.pintar_bloque(*datos)
 
-    def pintar_bloque(self, nombre_materia, profesor, salon, dia_str, h_inicio_str, h_fin_str, color_hex=None):
+    def _registrar_bloque(self, grupo, datos):
         try:
-            if dia_str not in self.dias: return 
-            col = self.dias.index(dia_str)
-            
-            # Calculo de filas
-            h_ini, m_ini = map(int, h_inicio_str.split(':'))
-            row_start = (h_ini - self.hora_inicio) * 2
-            if m_ini >= 30: row_start += 1
-            
-            h_fin, m_fin = map(int, h_fin_str.split(':'))
-            row_end = (h_fin - self.hora_inicio) * 2
-            if m_fin >= 30: row_end += 1
+            col, _, _, row_start, row_end = self._ubicar(*datos[3:6])
+        except (ValueError, AttributeError):
+            return # pintar_bloque informara el error
+        if not 0 <= col < len(self.dias) or row_end <= row_start:
+            return # pintar_bloque tampoco lo dibuja
+        id_bloque = self.siguiente_bloque
+        self.siguiente_bloque += 1
+        self.bloques[id_bloque] = (grupo, col, row_start, row_end, datos)
+        self.bloques_por_grupo.setdefault(grupo, []).append(id_bloque)
+        for r in range(row_start, row_end):
+            self.bloques_en_celda.setdefault((r, col), set()).add(id_bloque)
+
+    def reemplazar_grupo(self, grupo, bloques):
+        """
+        Quita los bloques de 'grupo' y pinta en su lugar 'bloques' (tuplas con
+        los argumentos de pintar_bloque). Solo se tocan las celdas de los
+        bloques que se enciman, directa o indirectamente, con los que cambian;
+        el costo depende del cambio y no del tamano del catalogo.
+        """
+        ids_viejos = self.bloques_por_grupo.pop(grupo, [])
+        for datos in bloques:
+            self._registrar_bloque(grupo, datos)
+        ids_nuevos = self.bloques_por_grupo.get(grupo, [])
+
+        # 1. Componente: todo bloque que comparte celda con uno afectado
+        componente = set(ids_viejos) | set(ids_nuevos)
+        pendientes = list(componente)
+        while pendientes:
+            _, col, row_start, row_end, _ = self.bloques[pendientes.pop()]
+            for r in range(row_start, row_end):
+                for vecino in self.bloques_en_celda.get((r, col), ()):
+                    if vecino not in componente:
+                        componente.add(vecino)
+                        pendientes.append(vecino)
+
+        # 2. Borrar las tarjetas de esas celdas y sus minutos del indice de
+        #    intervalos (todo pertenece a bloques del componente)
+        for id_bloque in componente:
+            _, col, row_start, row_end, datos = self.bloques[id_bloque]
+            _, inicio, fin, _, _ = self._ubicar(*datos[3:6])
+            self.intervalos.quitar(col, inicio, fin)
+            for r in range(row_start, row_end):
+                indice = self.modelo.indice_en(r, col)
+                if indice >= 0:
+                    tarjeta = self.modelo.tarjetas[indice]
+                    if tarjeta.duracion > 1:
+                        self.setSpan(tarjeta.fila, tarjeta.columna, 1, 1)
+                    self.modelo.liberar(indice)
+
+        for id_bloque in ids_viejos:
+            _, col, row_start, row_end, _ = self.bloques.pop(id_bloque)
+            componente.discard(id_bloque)
+            for r in range(row_start, row_end):
+                celda = self.bloques_en_celda[(r, col)]
+                celda.discard(id_bloque)
+                if not celda:
+                    del self.bloques_en_celda[(r, col)]
+
+        # 3. Repintar el componente en el orden original
+        for id_bloque in sorted(componente):
+            self.pintar_bloque(*self.bloques[id_bloque][4])
+
+    def quitar_grupo(self, grupo):
+        self.reemplazar_grupo(grupo, [])
+
+    def pintar_bloque(self, nombre_materia, profesor, salon, dia, h_inicio_str, h_fin_str, color_hex=None):
+        try:
+            col, inicio, fin, row_start, row_end = self._ubicar(dia, h_inicio_str, h_fin_str)
+            if not 0 <= col < len(self.dias): return 
             
             duracion_filas = row_end - row_start
             if duracion_filas <= 0: return 
 
-            # --- DETECCION DE CONFLICTOS ---
-            item_conflicto = None
-            for r in range(row_start, row_end):
-                if (r, col) in self.celdas_ocupadas:
-                    item_conflicto = self.celdas_ocupadas[(r, col)]
-                    break
-            
             nuevo_texto = f"{nombre_materia}\n{profesor}\n({salon})"
 
-            if item_conflicto:
-                # --- LOGICA DE LISTA NUMERADA ---
-                # 1. Recuperamos la lista de materias que ya estan en ese bloque
-                lista_materias = item_conflicto.data(Qt.UserRole)
-                
-                if not lista_materias:
-                    # Si el bloque era normal y es su primer choque, quizas no tenia lista aun.
-                    # Creamos la lista usando el texto que ya tenia.
-                    lista_materias = [item_conflicto.text()]
-
-                # 2. Agregamos la nueva materia a la lista
-                lista_materias.append(nuevo_texto)
-                
-                # 3. Guardamos la lista actualizada
-                item_conflicto.setData(Qt.UserRole, lista_materias)
-                
-                # 4. Reconstruimos el Tooltip numerado desde cero
-                tooltip_construido = "!!! CONFLICTO DETECTADO !!!"
-                for i, materia in enumerate(lista_materias):
-                    # i+1 genera los numeros 1, 2, 3...
-                    tooltip_construido += f"\n\n{i+1}. {materia}"
-                
-                # 5. Actualizamos visualmente
-                item_conflicto.setToolTip(tooltip_construido)
-                item_conflicto.setText("!!! CHOQUE MULTIPLE\n(Ver detalles)")
-                item_conflicto.setBackground(QColor("#e74c3c")) # Rojo
-                
-                return # Salimos para no pintar encima
+            # --- DETECCION DE CONFLICTOS ---
+            # El choque se decide por minutos; si ademas ya hay algo en esas
+            # celdas, el bloque se agrega a la lista numerada de ese bloque
+            choque = self.intervalos.choca(col, inicio, fin)
+            self.intervalos.agregar(col, inicio, fin)
+            for r in range(row_start, row_end):
+                indice = self.modelo.indice_en(r, col)
+                if indice >= 0:
+                    self.modelo.agregar_texto(indice, nuevo_texto, choque)
+                    return # Salimos para no pintar encima
 
-            # --- SI NO HAY CHOQUE ---
-            item = QTableWidgetItem(nuevo_texto)
-            item.setToolTip(f"{nombre_materia}\n{profesor}\n{salon}")
-            
-            # Guardamos este texto en la lista interna para estar listos por si alguien choca despues
-            item.setData(Qt.UserRole, [nuevo_texto]) 
-            
-            if color_hex:
-                item.setBackground(QColor(color_hex))
-            else:
-                item.setBackground(QColor("#3498db"))
-                
-            item.setForeground(QColor("white"))
-            item.setTextAlignment(0x0084) 
-            
-            self.setItem(row_start, col, item)
+            # --- CELDAS LIBRES ---
+            # Aun asi puede chocar: con un bloque que se agrego a la tarjeta
+            # de otras filas pero cuyos minutos llegan hasta estas
+            self.modelo.ocupar(Tarjeta(
+                row_start, col, duracion_filas, nuevo_texto,
+                f"{nombre_materia}\n{profesor}\n{salon}",
+                color_hex or COLOR_POR_DEFECTO, choque
+            ))
             if duracion_filas > 1:
                 self.setSpan(row_start, col, duracion_filas, 1)
-            
-            # Registrar propiedad del espacio
-            for r in range(row_start, row_end):
-                self.celdas_ocupadas[(r, col)] = item
                 
         except Exception as e:
             print(f"Error pintando bloque: {e}")
@@ -219,4 +452,4 @@ class HorarioGrid(QTableWidget):
         r = random.randint(100, 200)
         g = random.randint(100, 200)
         b = random.randint(150, 250)
-        return f"#{r:02x}{g:02x}{b:02x}"
\ No newline at end of file
+        return f"#{r:02x}{g:02x}{b:02x}"
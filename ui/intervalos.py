@@ -0,0 +1,40 @@
+from bisect import bisect_left, bisect_right
+
+# --- INDICE DE INTERVALOS ---
+# Sin Qt (lo usa HorarioGrid): se puede probar sin interfaz grafica.
+
+class IndiceIntervalos:
+    """
+    Minutos ocupados de cada dia como intervalos disjuntos y ordenados (la
+    union de los bloques pintados). Saber si un bloque choca con algo es una
+    busqueda binaria, con precision de minutos (07:50 no es 07:30).
+    """
+
+    def __init__(self, dias):
+        self.inicios = [[] for _ in range(dias)]
+        self.fines = [[] for _ in range(dias)]
+
+    def _rango(self, dia, inicio, fin):
+        """Posiciones [i, j) de los intervalos que se enciman con [inicio, fin)."""
+        i = bisect_right(self.fines[dia], inicio)  # Primero que termina despues de 'inicio'
+        j = bisect_left(self.inicios[dia], fin)    # Los que empiezan antes de 'fin'
+        return i, j
+
+    def choca(self, dia, inicio, fin):
+        i, j = self._rango(dia, inicio, fin)
+        return i < j
+
+    def agregar(self, dia, inicio, fin):
+        i, j = self._rango(dia, inicio, fin)
+        inicios, fines = self.inicios[dia], self.fines[dia]
+        if i < j: # Se funde con los que toca
+            inicio = min(inicio, inicios[i])
+            fin = max(fin, fines[j - 1])
+            del inicios[i:j], fines[i:j]
+        inicios.insert(i, inicio)
+        fines.insert(i, fin)
+
+    def quitar(self, dia, inicio, fin):
+        """Borra el intervalo (ya fundido) que contiene a [inicio, fin)."""
+        i, j = self._rango(dia, inicio, fin)
+        del self.inicios[dia][i:j], self.fines[dia][i:j]
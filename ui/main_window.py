@@ -1,14 +1,34 @@
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
                                QHBoxLayout, QLabel, QPushButton, 
                                QTabWidget, QFrame, QListWidget, QMessageBox,
-                               QListWidgetItem, QFileDialog)
+                               QListWidgetItem, QFileDialog, QProgressBar, QComboBox,
+                               QCheckBox, QPlainTextEdit)
 
 from PySide6.QtGui import QPixmap, QPainter, QRegion
-from PySide6.QtCore import Qt, QPoint, QSize, QRect
+from PySide6.QtCore import Qt, QPoint, QSize, QRect, QThread, QTimer
 
-from ui.dialogs import DialogoMateria
+from ui.dialogs import DialogoMateria, DialogoRestricciones
+from ui.generador import TrabajadorGenerador
 from ui.grid_widget import HorarioGrid
+import catalogo
 import database
+import engine
+import exportador
+import instrumentacion
+
+# Cuantos horarios envia el hilo generador en cada lote
+TAMANO_LOTE = 50
+
+# Modos de generacion: texto del combo y pesos para engine.mejores_selecciones
+# (None = todos los horarios, en el orden del motor)
+MEJORES_K = 20
+ORDENES_GENERACION = (
+    ("Todos los horarios", None),
+    (f"Los {MEJORES_K} con menos huecos", {"huecos": 1}),
+    (f"Los {MEJORES_K} que entran mas tarde", {"entrada_temprana": 1}),
+    (f"Los {MEJORES_K} con mas dias libres", {"dias_con_clase": 1}),
+    (f"Los {MEJORES_K} con menos edificios", {"edificios": 1}),
+)
 
 class VentanaPrincipal(QMainWindow):
     def __init__(self):
@@ -52,6 +72,23 @@ class VentanaPrincipal(QMainWindow):
         self.btn_generar.setStyleSheet("background-color: #4CAF50; color: white; padding: 10px; margin-top: 10px;")
         layout_izq.addWidget(self.btn_generar)
         
+        self.combo_orden = QComboBox()
+        for texto, pesos in ORDENES_GENERACION:
+            self.combo_orden.addItem(texto, pesos)
+        layout_izq.addWidget(self.combo_orden)
+        
+        self.btn_restricciones = QPushButton("Restricciones...")
+        self.btn_restricciones.clicked.connect(self.abrir_dialogo_restricciones)
+        layout_izq.addWidget(self.btn_restricciones)
+        
+        # Secciones con los mismos bloques (solo cambia profesor o salon) se
+        # ven iguales en el grid: se muestran como un solo horario
+        self.check_agrupar = QCheckBox("Agrupar secciones con el mismo horario")
+        layout_izq.addWidget(self.check_agrupar)
+        
+        self.btn_exportar_catalogo = QPushButton("Exportar Catalogo (CSV/JSONL)")
+        layout_izq.addWidget(self.btn_exportar_catalogo)
+        
         # --- Panel Derecho (Tabs) ---
         self.panel_derecho = QWidget()
         layout_der = QVBoxLayout(self.panel_derecho)
@@ -88,13 +125,43 @@ class VentanaPrincipal(QMainWindow):
         
         layout_tab2.addLayout(layout_nav)
         
+        # Progreso de la generacion (solo visible mientras corre el motor)
+        layout_progreso = QHBoxLayout()
+        self.barra_progreso = QProgressBar()
+        self.barra_progreso.setRange(0, 1000)
+        self.lbl_progreso = QLabel("")
+        self.btn_cancelar = QPushButton("Cancelar")
+        self.btn_cancelar.clicked.connect(self.cancelar_generacion)
+        
+        layout_progreso.addWidget(self.barra_progreso)
+        layout_progreso.addWidget(self.lbl_progreso)
+        layout_progreso.addWidget(self.btn_cancelar)
+        layout_tab2.addLayout(layout_progreso)
+        self.mostrar_controles_progreso(False)
+        
+        self.timer_progreso = QTimer(self)
+        self.timer_progreso.setInterval(100)
+        self.timer_progreso.timeout.connect(self.actualizar_progreso)
+        
         # Grid de resultados
         self.grid_resultados = HorarioGrid()
         layout_tab2.addWidget(self.grid_resultados)
         
         # Boton Exportar
+        layout_exportar = QHBoxLayout()
         self.btn_exportar = QPushButton("Exportar este Horario (Imagen)")
-        layout_tab2.addWidget(self.btn_exportar)
+        self.btn_exportar_datos = QPushButton("Exportar Horarios (CSV/JSONL/iCal)")
+        layout_exportar.addWidget(self.btn_exportar)
+        layout_exportar.addWidget(self.btn_exportar_datos)
+        layout_tab2.addLayout(layout_exportar)
+        
+        # Panel de diagnostico: solo con la instrumentacion activa
+        # (HORARIO_DIAGNOSTICO=1), un resumen por operacion
+        self.panel_diagnostico = QPlainTextEdit()
+        self.panel_diagnostico.setReadOnly(True)
+        self.panel_diagnostico.setMaximumHeight(100)
+        self.panel_diagnostico.setVisible(instrumentacion.activa())
+        layout_tab2.addWidget(self.panel_diagnostico)
         
         self.tabs.addTab(self.tab_global, "Vista Global")
         self.tabs.addTab(self.tab_resultados, "Horarios Generados")
@@ -110,10 +177,18 @@ class VentanaPrincipal(QMainWindow):
         # Variables de estado para el motor
         self.resultados_generados = [] 
         self.indice_actual = 0
+        self.total_combinaciones = 0
+        self.hilo_generador = None
+        self.trabajador = None
+        self.operacion_generar = None # instrumentacion.Operacion de la generacion en curso
+        self.restricciones = engine.Restricciones()
+        self.clases = None # engine.ClasesEquivalencia si se agrupan las secciones
         
         # CONEXIONES FINALES (IMPORTANTE)
         self.btn_generar.clicked.connect(self.ejecutar_generador)
         self.btn_exportar.clicked.connect(self.exportar_horario_imagen)
+        self.btn_exportar_datos.clicked.connect(self.exportar_horarios_archivo)
+        self.btn_exportar_catalogo.clicked.connect(self.exportar_catalogo_archivo)
 
     # --- FUNCIONES DE LOGICA ---
 
@@ -132,7 +207,7 @@ class VentanaPrincipal(QMainWindow):
 
             if exito:
                 self.cargar_lista_materias()
-                self.actualizar_vista_global()
+                self.refrescar_materias_en_vista(datos['nombre'])
                 QMessageBox.information(self, "Exito", mensaje_exito)
             else:
                 QMessageBox.critical(self, "Error", "No se pudo guardar la materia")
@@ -144,6 +219,7 @@ class VentanaPrincipal(QMainWindow):
         for id_mat, nombre in materias:
             item = QListWidgetItem(f"{contador}. {nombre}")
             item.setData(Qt.UserRole, id_mat) 
+            item.setData(Qt.UserRole + 1, nombre)
             self.lista_materias.addItem(item)
             contador += 1
 
@@ -165,7 +241,7 @@ class VentanaPrincipal(QMainWindow):
         if respuesta == QMessageBox.Yes:
             if database.eliminar_materia(id_materia):
                 self.cargar_lista_materias()
-                self.actualizar_vista_global() 
+                self.refrescar_materias_en_vista(item_actual.data(Qt.UserRole + 1))
                 QMessageBox.information(self, "Listo", "Materia eliminada.")
             else:
                 QMessageBox.critical(self, "Error", "No se pudo eliminar.")
@@ -182,133 +258,248 @@ class VentanaPrincipal(QMainWindow):
             nuevos_datos = dialogo.obtener_datos()
             if database.actualizar_materia_existente(id_materia, nuevos_datos):
                 self.cargar_lista_materias()
-                self.actualizar_vista_global()
+                self.refrescar_materias_en_vista(datos_actuales['nombre'], nuevos_datos['nombre'])
                 QMessageBox.information(self, "Exito", "Materia actualizada.")
             else:
                 QMessageBox.critical(self, "Error", "No se pudo actualizar.")
 
     def actualizar_vista_global(self):
+        """Repinta todo el catalogo; tras un cambio usar refrescar_materias_en_vista."""
+        operacion = instrumentacion.iniciar('vista_global')
         self.grid_global.limpiar()
-        conn = database.crear_conexion()
-        if not conn: return
-        
-        try:
-            cursor = conn.cursor()
-            query = """
-                SELECT m.nombre, o.profesor, COALESCE(b.salon, o.salon), b.dia, b.hora_inicio, b.hora_fin
-                FROM bloques b
-                JOIN opciones o ON b.opcion_id = o.id
-                JOIN materias m ON o.materia_id = m.id
-            """
-            cursor.execute(query)
-            filas = cursor.fetchall()
-
-            colores_materias = {}
-            for nombre, prof, salon, dia, inicio, fin in filas:
-                if nombre not in colores_materias:
-                    colores_materias[nombre] = self.grid_global.generar_color_random()
-                self.grid_global.pintar_bloque(nombre, prof, salon, dia, inicio, fin, colores_materias[nombre])
-                
-        except Exception as e:
-            print(f"Error al leer datos para el grid: {e}")
-        finally:
-            conn.close()
+        self.colores_materias = {}
+        
+        for nombre, _, prof, salon, dia, inicio, fin in catalogo.filas():
+            clave = catalogo.clave_materia(nombre)
+            if clave not in self.colores_materias:
+                self.colores_materias[clave] = self.grid_global.generar_color_random()
+            self.grid_global.agregar_bloque(clave, nombre, prof, salon, dia, inicio, fin, self.colores_materias[clave])
+        self.terminar_operacion(operacion)
+
+    def refrescar_materias_en_vista(self, *nombres):
+        """
+        Actualiza en la vista global solo los bloques de estas materias (por
+        ejemplo el nombre anterior y el nuevo al editar). Las demas materias
+        conservan sus celdas y sus colores.
+        """
+        for clave in {catalogo.clave_materia(nombre) for nombre in nombres}:
+            filas = catalogo.filas_de_materia(clave)
+            if filas:
+                color = self.colores_materias.setdefault(clave, self.grid_global.generar_color_random())
+            else:
+                self.colores_materias.pop(clave, None)
+            self.grid_global.reemplazar_grupo(clave, [
+                (nombre, prof, salon, dia, inicio, fin, color)
+                for nombre, _, prof, salon, dia, inicio, fin in filas
+            ])
 
     # --- MOTOR Y GENERACION ---
 
+    def abrir_dialogo_restricciones(self):
+        dialogo = DialogoRestricciones(self.cargar_datos_para_motor(), self.restricciones, self)
+        if dialogo.exec():
+            self.restricciones = dialogo.obtener_restricciones()
+            r = self.restricciones
+            activas = (len(r.dias_libres) + len(r.ventanas_bloqueadas) + len(r.profesores_requeridos)
+                       + len(r.profesores_prohibidos) + (r.max_minutos_dia is not None))
+            self.btn_restricciones.setText(f"Restricciones ({activas})..." if activas else "Restricciones...")
+
     def cargar_datos_para_motor(self):
-        import engine
-        conn = database.crear_conexion()
-        if not conn: return []
-        
-        cursor = conn.cursor()
-        query = """
-            SELECT m.nombre, o.id, o.profesor, COALESCE(b.salon, o.salon), b.dia, b.hora_inicio, b.hora_fin
-            FROM bloques b
-            JOIN opciones o ON b.opcion_id = o.id
-            JOIN materias m ON o.materia_id = m.id
-        """
-        cursor.execute(query)
-        filas = cursor.fetchall()
-        conn.close()
-
-        agrupacion = {}
-        for nombre, id_op, prof, salon, dia, inicio, fin in filas:
-            if nombre not in agrupacion: agrupacion[nombre] = {}
-            if id_op not in agrupacion[nombre]:
-                agrupacion[nombre][id_op] = {
-                    "profesor": prof, "salon": salon, "bloques_obj": []
-                }
-
-            min_inicio = engine.convertir_hora_a_minutos(inicio)
-            min_fin = engine.convertir_hora_a_minutos(fin)
-            agrupacion[nombre][id_op]["bloques_obj"].append(
-                engine.Bloque(dia, min_inicio, min_fin, salon)
-            )
-            
-        lista_materias_motor = []
-        id_falso = 1
-        for nombre_mat, opciones_dict in agrupacion.items():
-            lista_opciones_obj = []
-            for id_op, info in opciones_dict.items():
-                op_obj = engine.Opcion(
-                    id_opcion=id_op,
-                    nombre_materia=nombre_mat,
-                    profesor=info['profesor'],
-                    salon=info['salon'],
-                    bloques=info['bloques_obj']
-                )
-                lista_opciones_obj.append(op_obj)
-            lista_materias_motor.append(engine.Materia(id_falso, nombre_mat, lista_opciones_obj))
-            id_falso += 1
-        return lista_materias_motor
+        return catalogo.materias_para_motor()
+
+    def terminar_operacion(self, operacion):
+        """Cierra una medicion (ver instrumentacion.iniciar) y la agrega al panel de diagnostico."""
+        if operacion is not None:
+            self.panel_diagnostico.appendPlainText(operacion.terminar())
 
     def ejecutar_generador(self):
-        import engine
+        if self.hilo_generador is not None:
+            return # Ya hay una generacion en curso
+
+        # Desde el clic hasta el ultimo lote. El perfil (si se pidio) lo toma
+        # el hilo del motor: aqui solo se veria el ciclo de eventos de Qt
+        self.operacion_generar = instrumentacion.iniciar('generar', perfilar=False)
         materias_motor = self.cargar_datos_para_motor()
         if not materias_motor:
+            self.terminar_operacion(self.operacion_generar)
+            self.operacion_generar = None
             QMessageBox.warning(self, "Vacio", "No hay materias registradas.")
             return
 
-        self.resultados_generados = engine.generar_combinaciones(materias_motor)
+        pesos = self.combo_orden.currentData()
+        if self.check_agrupar.isChecked() and pesos is None:
+            self.clases = engine.agrupar_equivalentes(materias_motor, restricciones=self.restricciones)
+        else:
+            self.clases = None
+
+        # Los horarios se guardan como indices de opcion, no como objetos
+        # (con clases, uno por patron: el de la primera seccion de cada clase)
+        self.resultados_generados = engine.ResultadosCompactos(materias_motor)
+        self.indice_actual = 0
+        self.total_combinaciones = 0
+        self.grid_resultados.limpiar()
+        self.lbl_contador.setText("Buscando...")
+        self.btn_prev.setEnabled(False)
+        self.btn_next.setEnabled(False)
+
+        # El motor corre en su propio hilo; la ventana sigue respondiendo
+        self.hilo_generador = QThread(self)
+        self.trabajador = TrabajadorGenerador(
+            materias_motor, TAMANO_LOTE, pesos, MEJORES_K, self.restricciones, self.clases
+        )
+        self.trabajador.moveToThread(self.hilo_generador)
+
+        self.hilo_generador.started.connect(self.trabajador.ejecutar)
+        self.trabajador.total_calculado.connect(self.al_calcular_total)
+        self.trabajador.lote_listo.connect(self.al_recibir_lote)
+        self.trabajador.terminado.connect(self.al_terminar_generacion)
+        self.trabajador.terminado.connect(self.hilo_generador.quit)
+        self.hilo_generador.finished.connect(self.liberar_hilo_generador)
+        # Cada generacion crea hilo y trabajador nuevos: Qt los borra al terminar
+        self.hilo_generador.finished.connect(self.trabajador.deleteLater)
+        self.hilo_generador.finished.connect(self.hilo_generador.deleteLater)
+
+        self.btn_generar.setEnabled(False)
+        self.barra_progreso.setValue(0)
+        self.lbl_progreso.setText("Contando combinaciones...")
+        self.mostrar_controles_progreso(True)
+        self.tabs.setCurrentIndex(1)
+
+        self.hilo_generador.start()
+        self.timer_progreso.start()
+
+    def cancelar_generacion(self):
+        if self.trabajador is not None:
+            self.trabajador.cancelar()
+
+    def mostrar_controles_progreso(self, visible):
+        self.barra_progreso.setVisible(visible)
+        self.lbl_progreso.setVisible(visible)
+        self.btn_cancelar.setVisible(visible)
+
+    def actualizar_progreso(self):
+        """Lee los contadores del motor (los escribe el hilo generador)."""
+        if self.trabajador is None:
+            return
+        estado = self.trabajador.estado
+        if estado.nodos == 0:
+            return # Todavia contando
+        if self.total_combinaciones:
+            # QProgressBar usa int de 32 bits: trabajamos en milesimas
+            self.barra_progreso.setValue(estado.soluciones * 1000 // self.total_combinaciones)
+        self.lbl_progreso.setText(
+            f"{estado.nodos} nodos explorados, {estado.soluciones} horarios encontrados"
+        )
+
+    def al_calcular_total(self, total):
+        self.total_combinaciones = total or 0 # None: no se conoce hasta terminar
+
+    def al_recibir_lote(self, lote):
+        primero = not self.resultados_generados
+        self.resultados_generados.extender(lote)
+        if primero:
+            self.mostrar_resultado_actual()
+        else:
+            self.actualizar_navegacion()
+
+    def al_terminar_generacion(self, cancelado):
+        self.timer_progreso.stop()
+        self.actualizar_progreso()
+        self.mostrar_controles_progreso(False)
+        self.btn_generar.setEnabled(True)
+
         cant = len(self.resultados_generados)
-        
+        if cancelado or not self.total_combinaciones:
+            # Nos quedamos con lo que alcanzo a encontrar
+            self.total_combinaciones = cant
+            self.actualizar_navegacion()
+        self.terminar_operacion(self.operacion_generar)
+        self.operacion_generar = None
+
         if cant == 0:
-            QMessageBox.warning(self, "Ups", "No hay combinaciones posibles sin choques.")
+            if cancelado:
+                mensaje = "Generacion cancelada."
+            elif self.restricciones.vacia():
+                mensaje = "No hay combinaciones posibles sin choques."
+            else:
+                mensaje = "No hay combinaciones sin choques que cumplan las restricciones."
+            QMessageBox.warning(self, "Ups", mensaje)
             self.lbl_contador.setText("0 / 0")
             self.grid_resultados.limpiar()
-            return
-        
-        QMessageBox.information(self, "Exito", f"Se encontraron {cant} combinaciones.")
-        self.tabs.setCurrentIndex(1)
-        self.indice_actual = 0
-        self.mostrar_resultado_actual()
+        elif cancelado:
+            QMessageBox.information(self, "Cancelado", f"Generacion cancelada. Se conservan {cant} combinaciones.")
+        elif self.clases is not None:
+            QMessageBox.information(self, "Exito", f"Se encontraron {cant} horarios distintos "
+                                                   "(agrupando secciones con el mismo horario).")
+        else:
+            QMessageBox.information(self, "Exito", f"Se encontraron {cant} combinaciones.")
 
-    def mostrar_resultado_actual(self):
+    def liberar_hilo_generador(self):
+        self.hilo_generador = None
+        self.trabajador = None
+
+    def closeEvent(self, event):
+        # No dejar el hilo del motor vivo al cerrar la ventana
+        if self.hilo_generador is not None:
+            self.trabajador.cancelar()
+            self.hilo_generador.quit()
+            self.hilo_generador.wait()
+        super().closeEvent(event)
+
+    def actualizar_navegacion(self):
+        """Actualiza el contador y los botones segun lo cargado hasta ahora."""
         if not self.resultados_generados: return
-        
-        combinacion = self.resultados_generados[self.indice_actual]
-        total = len(self.resultados_generados)
-        self.lbl_contador.setText(f"Opcion {self.indice_actual + 1} de {total}")
-        
+        total = self.total_combinaciones or f"{len(self.resultados_generados)}+"
+        texto = f"Opcion {self.indice_actual + 1} de {total}"
+        if self.clases is not None:
+            patron = self.resultados_generados.seleccion(self.indice_actual)
+            texto += f" ({self.clases.cantidad(patron)} combinaciones de secciones)"
+        self.lbl_contador.setText(texto)
         self.btn_prev.setEnabled(self.indice_actual > 0)
-        self.btn_next.setEnabled(self.indice_actual < total - 1)
-        
-        self.grid_resultados.limpiar()
-        import engine 
+        self.btn_next.setEnabled(self.indice_actual < len(self.resultados_generados) - 1)
+
+    def mostrar_resultado_actual(self):
+        if not self.resultados_generados: return
+        with instrumentacion.medir('ui.mostrar_horario'):
+            self._mostrar_seleccion(self.resultados_generados.seleccion(self.indice_actual))
+
+    def _mostrar_seleccion(self, seleccion):
+        self.actualizar_navegacion()
         
         colores_por_materia = {}
-        for opcion in combinacion:
+        bloques = []
+        for i in seleccion:
+            opcion = self.resultados_generados.opciones[i]
             if opcion.nombre_materia not in colores_por_materia:
                 colores_por_materia[opcion.nombre_materia] = self.grid_resultados.generar_color_random()
             
             color = colores_por_materia[opcion.nombre_materia]
+            profesor, salon_clase = opcion.profesor, None
+            if self.clases is not None:
+                profesor, salon_clase = self.describir_clase(i)
             for bloque in opcion.bloques:
-                self.grid_resultados.pintar_bloque(
-                    opcion.nombre_materia, opcion.profesor, bloque.salon,
+                bloques.append((
+                    opcion.nombre_materia, profesor, salon_clase or bloque.salon,
                     bloque.dia, engine.minutos_a_hora(bloque.hora_inicio),
                     engine.minutos_a_hora(bloque.hora_fin), color
-                )
+                ))
+        
+        # Un solo reinicio del modelo: no se crean widgets ni items por celda
+        self.grid_resultados.cargar_bloques(bloques)
+
+    def describir_clase(self, representante):
+        """
+        (profesores, salon) de todas las secciones de la clase para mostrar
+        en el grid. El salon es None si todas usan los mismos salones.
+        """
+        miembros = [self.resultados_generados.opciones[i] for i in self.clases.miembros[representante]]
+        profesores = list(dict.fromkeys(opcion.profesor for opcion in miembros))
+        if len(profesores) > 3:
+            texto = f"{profesores[0]} / {profesores[1]} y {len(profesores) - 2} mas"
+        else:
+            texto = " / ".join(profesores)
+        salones = {tuple(bloque.salon for bloque in opcion.bloques) for opcion in miembros}
+        return texto, "Varios salones" if len(salones) > 1 else None
 
     def mostrar_horario_siguiente(self):
         if self.indice_actual < len(self.resultados_generados) - 1:
@@ -408,4 +599,50 @@ class VentanaPrincipal(QMainWindow):
                 self.grid_resultados.setMaximumSize(QSize(16777215, 16777215))
                 for r in range(self.grid_resultados.rowCount()):
                     self.grid_resultados.setRowHidden(r, False)
-                QMessageBox.critical(self, "Error", f"Fallo al guardar:\n{e}")
\ No newline at end of file
+                QMessageBox.critical(self, "Error", f"Fallo al guardar:\n{e}")
+
+    def exportar_horarios_archivo(self):
+        """
+        CSV y JSONL llevan todos los horarios generados; iCal solo el que se
+        esta viendo (un calendario con varios horarios encimados no sirve).
+        """
+        if not self.resultados_generados:
+            QMessageBox.warning(self, "Vacio", "Primero genera un horario.")
+            return
+
+        nombre_archivo, filtro = QFileDialog.getSaveFileName(
+            self, "Exportar Horarios", "Horarios.csv",
+            "CSV (*.csv);;JSON Lines (*.jsonl);;Calendario iCal - horario actual (*.ics)"
+        )
+        if not nombre_archivo:
+            return
+
+        if nombre_archivo.lower().endswith('.ics'):
+            horarios = [self.resultados_generados[self.indice_actual]]
+        elif self.clases is not None:
+            # Cada patron se expande a sus secciones concretas al escribir
+            opciones = self.resultados_generados.opciones
+            horarios = (
+                [opciones[i] for i in seleccion]
+                for posicion in range(len(self.resultados_generados))
+                for seleccion in self.clases.expandir(self.resultados_generados.seleccion(posicion))
+            )
+        else:
+            horarios = self.resultados_generados
+        try:
+            exportador.exportar_horarios(nombre_archivo, horarios)
+            QMessageBox.information(self, "Exito", f"Horarios exportados:\n{nombre_archivo}")
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Error", f"Fallo al exportar:\n{e}")
+
+    def exportar_catalogo_archivo(self):
+        nombre_archivo, _ = QFileDialog.getSaveFileName(
+            self, "Exportar Catalogo", "Catalogo.csv", "CSV (*.csv);;JSON Lines (*.jsonl)"
+        )
+        if not nombre_archivo:
+            return
+        try:
+            exportador.exportar_catalogo(nombre_archivo)
+            QMessageBox.information(self, "Exito", f"Catalogo exportado:\n{nombre_archivo}")
+        except (OSError, ValueError, database.Error) as e:
+            QMessageBox.critical(self, "Error", f"Fallo al exportar:\n{e}")